@@ -0,0 +1,890 @@
+"""Benchmark the recreation_club data functions against a local SQLite stand-in.
+
+The stand-in implements the slice of the python-oracledb API the app uses
+(pool and asyncio pool, connection, cursor, executemany with batch errors,
+collections, out variables) on top of sqlite3, translating the few Oracle-only
+constructs the app's SQL relies on. The app module is imported unchanged: its
+pool factories simply receive stand-in pools instead of real Oracle pools.
+--round-trip-ms adds simulated network latency to every stand-in round trip.
+
+Example:
+    python benchmark.py --sessions 8 --ops 200 --output bench_results.json
+    python benchmark.py --compare bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as time_of_day, timedelta
+
+import oracledb
+
+# ---------------------------------------------------------------------------
+# SQLite stand-in for the python-oracledb API
+# ---------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE Member (
+    memberid INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, gender TEXT, phone TEXT,
+    email TEXT, join_date DATE, expire_date DATE, status TEXT
+);
+CREATE TABLE Instructor (instructorid INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT);
+CREATE TABLE Activity (
+    activityid INTEGER PRIMARY KEY, activityname TEXT, activity_date DATE, start_time TIMESTAMP,
+    end_time TIMESTAMP, capacity INTEGER, location TEXT, price REAL
+);
+CREATE TABLE InstructorActivity (
+    activityid INTEGER REFERENCES Activity (activityid),
+    instructorid INTEGER REFERENCES Instructor (instructorid),
+    PRIMARY KEY (activityid, instructorid)
+);
+CREATE TABLE SignUp (
+    signupid INTEGER PRIMARY KEY,
+    memberid INTEGER REFERENCES Member (memberid),
+    activityid INTEGER REFERENCES Activity (activityid),
+    signup_date TIMESTAMP
+);
+CREATE TABLE dual (dummy TEXT);
+INSERT INTO dual VALUES ('X');
+CREATE INDEX activity_date_id_ix ON Activity (activity_date, activityid);
+CREATE INDEX signup_activity_ix ON SignUp (activityid);
+"""
+
+# Oracle error codes the app looks at, keyed by the SQLite message that corresponds to them
+SQLITE_ERROR_CODES = [
+    ("UNIQUE constraint failed", 1, "ORA-00001: unique constraint violated"),
+    ("FOREIGN KEY constraint failed", 2291, "ORA-02291: integrity constraint violated - parent key not found"),
+    ("already exists", 955, "ORA-00955: name is already used by an existing object"),
+]
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" ", "seconds"))
+sqlite3.register_adapter(date, lambda value: f"{value.isoformat()} 00:00:00")
+for declared_type in ("DATE", "TIMESTAMP"):
+    sqlite3.register_converter(declared_type, lambda value: datetime.fromisoformat(value.decode()))
+
+
+class Sequences:
+    """Oracle-style sequences: non-transactional counters shared by every session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def nextval(self, name):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + 1
+            return self._values[name]
+
+    def restart(self, name, value):
+        with self._lock:
+            self._values[name] = value - 1
+
+
+def to_date(value, fmt):
+    if fmt.upper() == "DD-MON-YY":
+        return datetime.strptime(value, "%d-%b-%y").isoformat(" ", "seconds")
+    return value
+
+
+def to_timestamp(value, fmt):
+    # Oracle fills in the first day of the current month for a time-only TO_TIMESTAMP
+    parsed = datetime.strptime(value, "%H:%M:%S")
+    return datetime.combine(date.today().replace(day=1), parsed.time()).isoformat(" ", "seconds")
+
+
+# Oracle -> SQLite rewrites, applied in order
+TRANSLATIONS = [
+    (re.compile(r"SELECT (.+?) FROM dual CONNECT BY LEVEL <= (:\w+)", re.S),
+     r"WITH RECURSIVE lvl(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM lvl WHERE n < \2) SELECT \1 FROM lvl"),
+    (re.compile(r"(\w+)\.NEXTVAL", re.I), r"nextval('\1')"),
+    (re.compile(r"FETCH FIRST (:\w+) ROWS ONLY", re.I), r"LIMIT \1"),
+    (re.compile(r"SELECT column_value FROM TABLE\((:\w+)\)", re.I), r"SELECT value FROM json_each(\1)"),
+    (re.compile(r"\bAND ROWNUM = 1\b", re.I), ""),
+    (re.compile(r"\bNVL\(", re.I), "IFNULL("),
+    # SQLite 3.44+ could keep the ORDER BY inside group_concat(); older versions just drop it
+    (re.compile(r"\bLISTAGG\((.+?), ('[^']*')\) WITHIN GROUP \(ORDER BY [^)]*\)", re.I | re.S), r"group_concat(\1, \2)"),
+    (re.compile(r"\bGREATEST\(", re.I), "MAX("),
+    (re.compile(r"\bTRUNC\(SYSDATE\) - (\d+)", re.I), r"date('now', '-\1 days')"),
+    (re.compile(r"\bSYSDATE\b", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\s+FOR UPDATE\b", re.I), ""),  # SQLite serializes writers on its own
+    (re.compile(r"\s+ORGANIZATION INDEX\b", re.I), ""),
+    (re.compile(r":(\d+)"), r"?\1"),
+]
+ALTER_SEQUENCE = re.compile(r"ALTER SEQUENCE (\w+) RESTART START WITH (\d+)", re.I)
+
+
+def translate(statement):
+    for pattern, replacement in TRANSLATIONS:
+        statement = pattern.sub(replacement, statement)
+    return statement
+
+
+class Collection:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class CollectionType:
+    def newobject(self, values=()):
+        return Collection(values)
+
+
+class OutVar:
+    def __init__(self, arraysize):
+        self.values = [None] * arraysize
+
+    def getvalue(self, pos=0):
+        return self.values[pos]
+
+
+class BatchError:
+    def __init__(self, offset, code, message):
+        self.offset, self.code, self.message = offset, code, message
+
+
+def bind_value(value):
+    if isinstance(value, Collection):
+        return json.dumps(value.values, default=str)
+    return value
+
+
+DML_STATEMENT = re.compile(r"\s*(INSERT|UPDATE|DELETE|MERGE)\b", re.I)
+DPY_2040 = ('DPY-2040: parameters "batcherrors" and "arraydmlrowcounts" may only be true when used with insert, '
+            'update, delete and merge statements')
+
+
+def bind_params(params):
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return {name: bind_value(value) for name, value in params.items()}
+    return tuple(bind_value(value) for value in params)
+
+
+def oracle_error(exc):
+    for marker, code, message in SQLITE_ERROR_CODES:
+        if marker in str(exc):
+            if code == 1:  # Name the violated index or column, as Oracle names the constraint
+                constraint = str(exc).split(":", 1)[1].strip().removeprefix("index ").strip("'")
+                message = message.replace("constraint", f"constraint (CLUB.{constraint.upper()})")
+            return code, message
+    return 20000, f"ORA-20000: {exc}"
+
+
+class ErrorDetail:
+    """Stands in for the _Error object python-oracledb puts in an exception's args."""
+
+    def __init__(self, code, message):
+        self.code, self.message = code, message
+        self.full_code = message.split(":", 1)[0]
+
+    def __str__(self):
+        return self.message
+
+
+def as_oracle_error(exc):
+    code, message = oracle_error(exc)
+    error_class = oracledb.IntegrityError if code in (1, 2291) else oracledb.DatabaseError
+    return error_class(ErrorDetail(code, message))
+
+
+def signup_block(db, activity_id, member_id, signup_id, signup_date):
+    """Emulates SIGNUP_PLSQL; BEGIN IMMEDIATE plays the part of SELECT ... FOR UPDATE.
+
+    Keep in step with the PL/SQL: signup_plsql_check() runs the same cases through this emulation
+    and, given --oracle-dsn, through the real block.
+    """
+    if not db.in_transaction:
+        db.execute("BEGIN IMMEDIATE")
+    db.execute("SAVEPOINT signup_row")
+    try:
+        return signup_row(db, activity_id, member_id, signup_id, signup_date)
+    except sqlite3.DatabaseError as exc:  # WHEN OTHERS: undo this row only and return SQLERRM
+        db.execute("ROLLBACK TO signup_row")
+        return oracle_error(exc)[1]
+    finally:
+        db.execute("RELEASE signup_row")
+
+
+def signup_row(db, activity_id, member_id, signup_id, signup_date):
+    activity = db.execute("SELECT capacity FROM Activity WHERE activityid = ?", (activity_id,)).fetchone()
+    if activity is None:
+        return "missing"
+    mine, = db.execute("SELECT COUNT(*) FROM SignUp WHERE activityid = ? AND memberid = ?",
+                       (activity_id, member_id)).fetchone()
+    summary = db.execute("SELECT taken FROM ActivitySignupCount WHERE activityid = ?", (activity_id,)).fetchone()
+    if summary is None:
+        taken, = db.execute("SELECT COUNT(*) FROM SignUp WHERE activityid = ?", (activity_id,)).fetchone()
+        db.execute("INSERT INTO ActivitySignupCount (activityid, taken) VALUES (?, ?)", (activity_id, taken))
+    else:
+        taken, = summary
+    if mine == 0 and taken < activity[0]:
+        db.execute("INSERT INTO SignUp (signupid, memberid, activityid, signup_date) VALUES (?, ?, ?, ?)",
+                   (signup_id, member_id, activity_id, signup_date))
+        db.execute("UPDATE ActivitySignupCount SET taken = taken + 1 WHERE activityid = ?", (activity_id,))
+        return "ok"
+    return "duplicate" if mine else "full"
+
+
+def seat_count_merge(db):
+    """Emulates the MERGE in SEAT_COUNT_RECONCILE_STATEMENTS; returns the number of rows changed."""
+    before = db.total_changes
+    db.execute("""
+        INSERT INTO ActivitySignupCount (activityid, taken)
+        SELECT a.activityid, COUNT(s.signupid) FROM Activity a LEFT JOIN SignUp s ON s.activityid = a.activityid
+        GROUP BY a.activityid
+        ON CONFLICT (activityid) DO UPDATE SET taken = excluded.taken WHERE taken <> excluded.taken
+    """)
+    return db.total_changes - before
+
+
+class StandInCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.db.cursor()
+        self._out_vars = []
+        self._batch_errors = []
+        self._emulated_rowcount = None
+        self.prefetchrows = 2
+
+    @property
+    def arraysize(self):
+        return self._cursor.arraysize
+
+    @arraysize.setter
+    def arraysize(self, value):
+        self._cursor.arraysize = value
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        if self._emulated_rowcount is not None:
+            return self._emulated_rowcount
+        return self._cursor.rowcount
+
+    def bindnames(self):
+        return []
+
+    def var(self, typ, arraysize=1, **kwargs):
+        return OutVar(arraysize)
+
+    def setinputsizes(self, *args, **kwargs):
+        self._out_vars = [(pos, arg) for pos, arg in enumerate(args) if isinstance(arg, OutVar)]
+
+    def getbatcherrors(self):
+        return self._batch_errors
+
+    def _round_trip(self):
+        self.connection.pool.count_round_trip()
+
+    def execute(self, statement, params=None, **kwargs):
+        self._round_trip()
+        if kwargs:
+            params = kwargs
+        self._emulated_rowcount = None
+        emulation = self.connection.pool.emulations.get(statement)
+        if emulation is not None:
+            return self._run_emulation(emulation, [params or ()], batcherrors=False)
+
+        match = ALTER_SEQUENCE.search(statement)
+        if match:
+            self.connection.db.commit()  # DDL commits, as in Oracle
+            self.connection.pool.sequences.restart(match.group(1), int(match.group(2)))
+            return None
+
+        try:
+            self._cursor.execute(translate(statement), bind_params(params))
+        except sqlite3.DatabaseError as exc:
+            raise as_oracle_error(exc) from exc
+        self.connection.after_call()
+        return self
+
+    def executemany(self, statement, rows, batcherrors=False, **kwargs):
+        if (batcherrors or kwargs.get("arraydmlrowcounts")) and not DML_STATEMENT.match(statement):
+            raise oracledb.ProgrammingError(ErrorDetail(2040, DPY_2040))  # As the driver does, before any round trip
+        self._round_trip()
+        self._emulated_rowcount = None
+        emulation = self.connection.pool.emulations.get(statement)
+        if emulation is not None:
+            return self._run_emulation(emulation, rows, batcherrors)
+
+        translated = translate(statement)
+        self._batch_errors = []
+        for offset, row in enumerate(rows):
+            try:
+                self._cursor.execute(translated, bind_params(row))
+            except sqlite3.DatabaseError as exc:
+                if not batcherrors:
+                    raise as_oracle_error(exc) from exc
+                self._batch_errors.append(BatchError(offset, *oracle_error(exc)))
+        self.connection.after_call()
+
+    def _run_emulation(self, emulation, rows, batcherrors):
+        self._batch_errors = []
+        for offset, row in enumerate(rows):
+            try:
+                status = emulation(self.connection.db, *row)
+            except sqlite3.DatabaseError as exc:
+                if not batcherrors:
+                    raise as_oracle_error(exc) from exc
+                self._batch_errors.append(BatchError(offset, *oracle_error(exc)))
+                continue
+            if isinstance(status, int):  # Plain DML emulations report a row count instead of a status
+                self._emulated_rowcount = (self._emulated_rowcount or 0) + status
+                continue
+            for _, out_var in self._out_vars:
+                out_var.values[offset] = status
+        self.connection.after_call()
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, pool, db):
+        self.pool = pool
+        self.db = db
+        self.autocommit = False
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def after_call(self):
+        if self.autocommit:
+            self.db.commit()
+
+    def commit(self):
+        self.pool.count_round_trip()
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def ping(self):
+        self.db.execute("SELECT 1")
+
+    def gettype(self, name):
+        return CollectionType()
+
+    def close(self):
+        self.db.rollback()  # Like Oracle, an uncommitted transaction does not survive release
+        self.autocommit = False
+        self.pool.release(self.db)
+
+
+class StandInPool:
+    def __init__(self, path, size, acquire_timeout, round_trip_callback=None, round_trip_delay=0.0):
+        self.sequences = Sequences()
+        self.emulations = {}
+        self.acquire_timeout = acquire_timeout
+        self.round_trip_callback = round_trip_callback
+        self.round_trip_delay = round_trip_delay
+        self._idle = queue.Queue()
+        for _ in range(size):
+            db = sqlite3.connect(path, timeout=30, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+            db.execute("PRAGMA foreign_keys = ON")
+            db.create_function("nextval", 1, self.sequences.nextval)
+            db.create_function("to_date", 2, to_date)
+            db.create_function("to_timestamp", 2, to_timestamp)
+            self._idle.put(db)
+
+    def count_round_trip(self):
+        if self.round_trip_delay:
+            time.sleep(self.round_trip_delay)  # Simulated network latency
+        if self.round_trip_callback is not None:
+            self.round_trip_callback("stand-in")
+
+    def acquire(self):
+        try:
+            return StandInConnection(self, self._idle.get(timeout=self.acquire_timeout))
+        except queue.Empty:
+            raise oracledb.DatabaseError("DPY-4005: timed out waiting for the connection pool to return a connection")
+
+    def release(self, db):
+        self._idle.put(db)
+
+
+class StandInAsyncConnection:
+    """Enough of oracledb.AsyncConnection for the app: each call runs the stand-in on a worker thread."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def _fetchall(self, statement, parameters, arraysize):
+        cursor = self.connection.cursor()
+        try:
+            if arraysize:
+                cursor.arraysize = arraysize
+            cursor.execute(statement, parameters)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    async def fetchall(self, statement, parameters=None, arraysize=None):
+        return await asyncio.to_thread(self._fetchall, statement, parameters, arraysize)
+
+    async def close(self):
+        self.connection.close()
+
+
+class StandInAsyncPool:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def acquire(self):
+        return StandInAsyncConnection(await asyncio.to_thread(self.pool.acquire))
+
+
+def create_database(path, seed, members, instructors, activities, signups):
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.executescript("PRAGMA journal_mode = WAL;" + SCHEMA)
+
+    today = date.today()
+    db.executemany(
+        "INSERT INTO Instructor VALUES (?, ?, ?)",
+        [(i, f"Instructor{i}", f"Coach{i}") for i in range(1, instructors + 1)],
+    )
+    db.executemany(
+        "INSERT INTO Member VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'active')",
+        [
+            (i, f"First{i}", f"Last{i}", rng.choice("MF"), f"555-{i % 10000:04d}", f"member{i}@club.test",
+             today - timedelta(days=rng.randint(0, 365)), today + timedelta(days=rng.randint(0, 365)))
+            for i in range(1, members + 1)
+        ],
+    )
+    locations = ["Main Hall", "Studio A", "Studio B", "Pool", "Court 1", "Court 2"]
+    activity_rows = []
+    capacities = {}
+    for i in range(1, activities + 1):
+        day = today + timedelta(days=rng.randint(-365, 365))
+        start = datetime.combine(today.replace(day=1), datetime.min.time()) + timedelta(hours=rng.randint(7, 20))
+        capacities[i] = rng.randint(10, 40)
+        activity_rows.append((i, f"Class {i}", day, start, start + timedelta(hours=1), capacities[i],
+                              rng.choice(locations), rng.choice([0, 5, 10, 15, 20])))
+    db.executemany("INSERT INTO Activity VALUES (?, ?, ?, ?, ?, ?, ?, ?)", activity_rows)
+    db.executemany(
+        "INSERT INTO InstructorActivity VALUES (?, ?)",
+        [(i, rng.randint(1, instructors)) for i in range(1, activities + 1)],
+    )
+
+    signup_rows = []
+    booked = set()
+    taken = dict.fromkeys(capacities, 0)
+    while len(signup_rows) < signups and activities and members:
+        activity_id, member_id = rng.randint(1, activities), rng.randint(1, members)
+        if (activity_id, member_id) in booked or taken[activity_id] >= capacities[activity_id]:
+            if len(booked) >= sum(capacities.values()):
+                break
+            continue
+        booked.add((activity_id, member_id))
+        taken[activity_id] += 1
+        signup_rows.append((len(signup_rows) + 1, member_id, activity_id, datetime.now() - timedelta(days=rng.randint(0, 300))))
+    db.executemany("INSERT INTO SignUp VALUES (?, ?, ?, ?)", signup_rows)
+    db.commit()
+    db.close()
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+# Messages the app returns when a call broke, as opposed to a business outcome such as "Activity is full."
+ERROR_MARKERS = ("Database connection failed", "Failed to sign up new member", "Failed to sign up for activities",
+                 "Failed to sign up for activity:", "Failed to create activity", "Failed to create the series")
+
+
+def failed(result):
+    """True for an error message, or for a missing result: None, or a tuple such as (None, False)."""
+    text = result[0] if isinstance(result, tuple) and result else result
+    if text is None:
+        return True
+    return isinstance(text, str) and text.startswith(ERROR_MARKERS)
+
+
+shown_errors = threading.local()  # st.error() calls made on this thread since the last reset
+
+
+def count_shown_errors(st):
+    """Wrap st.error so run_scenario() can count errors the app only displays."""
+    show_error = st.error
+
+    def error(*args, **kwargs):
+        shown_errors.count = getattr(shown_errors, "count", 0) + 1
+        return show_error(*args, **kwargs)
+
+    st.error = error
+
+
+def run_scenario(name, operation, sessions, ops):
+    """Run `ops` calls of operation(i) spread over `sessions` threads; returns latency stats."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(i):
+        nonlocal errors
+        shown_errors.count = 0
+        start = time.perf_counter()
+        try:
+            result = operation(i)
+            error = failed(result) or shown_errors.count > 0
+        except Exception:
+            error = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += error
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(worker, range(ops)))
+    wall = time.perf_counter() - wall_start
+
+    stats = {
+        "ops": ops,
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_ops_per_sec": round(ops / wall, 2) if wall else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+    }
+    print(f"{name:<24} {stats['throughput_ops_per_sec']:>10.1f} ops/s  p50 {stats['p50_ms']:>8.2f} ms  "
+          f"p95 {stats['p95_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  errors {errors}")
+    return stats
+
+
+def rerun_operation(script_path):
+    """One top-to-bottom run of the app script, as Streamlit does on every widget interaction.
+
+    The script is compiled once (Streamlit caches the bytecode too) and executed in bare mode,
+    so the timing covers module-level work and the landing page, not the browser round trip.
+    """
+    with open(script_path) as source:
+        code = compile(source.read(), script_path, "exec")
+
+    def rerun(i):
+        namespace = {"__name__": "__main__", "__file__": script_path}
+        exec(code, namespace)
+        return namespace
+
+    rerun(0)  # The first run pays the one-off process start-up; only reruns are timed
+    quiet_streamlit_logs()  # Also covers loggers the first run created
+    return rerun
+
+
+def overbooking_check(rc, pool, sessions, capacity=5, attempts=40):
+    """Many concurrent sign-ups for one small class must never exceed its capacity."""
+    connection = pool.acquire()
+    cursor = connection.cursor()
+    cursor.execute("SELECT MAX(activityid) FROM Activity")
+    activity_id = (cursor.fetchone()[0] or 0) + 1
+    cursor.execute(
+        "INSERT INTO Activity VALUES (:1, 'Overbooking check', :2, :2, :2, :3, 'Main Hall', 0)",
+        (activity_id, datetime.now() + timedelta(days=1), capacity),
+    )
+    connection.commit()
+
+    def attempt(i):
+        return rc.signup_for_activity(f"Member{i + 1}", f"member{i + 1}@club.test", activity_id)
+
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(attempt, range(attempts)))
+
+    cursor.execute("SELECT COUNT(*) FROM SignUp WHERE activityid = :1", (activity_id,))
+    booked = cursor.fetchone()[0]
+    cursor.execute("SELECT taken FROM ActivitySignupCount WHERE activityid = :1", (activity_id,))
+    summary_taken = (cursor.fetchone() or [None])[0]
+    cursor.close()
+    connection.close()
+    check = {
+        "capacity": capacity,
+        "attempts": attempts,
+        "booked": booked,
+        "summary_taken": summary_taken,
+        "full_responses": sum(isinstance(result, str) and result.endswith(rc.SIGNUP_STATUS_MESSAGES["full"])
+                              for result in results),
+        "passed": booked == min(capacity, attempts) and summary_taken == booked,
+    }
+    print(f"{'overbooking check':<24} booked {booked}/{capacity} (summary says {summary_taken}) "
+          f"from {attempts} concurrent attempts: {'PASS' if check['passed'] else 'FAIL'}")
+    return check
+
+
+SIGNUP_PLSQL_CASES = [  # (activity, member, expected status) run in order against a one-seat class
+    ("class", "first", "ok"),
+    ("class", "first", "duplicate"),
+    ("class", "second", "full"),
+    ("missing", "first", "missing"),
+]
+
+
+def signup_plsql_check(rc, connection, label):
+    """Runs rc.SIGNUP_PLSQL on `connection` for SIGNUP_PLSQL_CASES, then rolls everything back.
+
+    Goes through rc.execute_signup_block(), so the block is bound and executed exactly as
+    apply_signups() does it; only the commit (apply_signups turns on autocommit) is left out.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT MAX(activityid) FROM Activity")
+        activity_id = (cursor.fetchone()[0] or 0) + 1
+        cursor.execute("SELECT MAX(memberid) FROM Member")
+        member_id = (cursor.fetchone()[0] or 0) + 1
+        cursor.execute("SELECT MAX(signupid) FROM SignUp")
+        signup_id = (cursor.fetchone()[0] or 0) + 1
+        tomorrow = datetime.now() + timedelta(days=1)
+        cursor.execute(
+            "INSERT INTO Activity (activityid, activityname, activity_date, start_time, end_time, capacity, location, price)"
+            " VALUES (:1, 'PL/SQL check', :2, :2, :2, 1, 'Main Hall', 0)",
+            (activity_id, tomorrow),
+        )
+        members = {"first": member_id, "second": member_id + 1}
+        for member in members.values():
+            cursor.execute(
+                "INSERT INTO Member (memberid, first_name, last_name, gender, phone, email, join_date, expire_date, status)"
+                " VALUES (:1, 'Check', 'Member', 'F', '555-000-0000', :2, :3, :3, 'active')",
+                (member, f"plsql-check-{member}@club.test", tomorrow),
+            )
+        activities = {"class": activity_id, "missing": activity_id + 1}
+        rows = [(activities[activity], members[member], signup_id + offset, tomorrow)
+                for offset, (activity, member, _) in enumerate(SIGNUP_PLSQL_CASES)]
+
+        statuses = rc.execute_signup_block(cursor, rows)  # The exact call apply_signups() makes
+        cursor.execute("SELECT COUNT(*) FROM SignUp WHERE activityid = :1", (activity_id,))
+        booked = cursor.fetchone()[0]
+        cursor.execute("SELECT taken FROM ActivitySignupCount WHERE activityid = :1", (activity_id,))
+        summary_taken = (cursor.fetchone() or [None])[0]
+        error = None
+    except oracledb.DatabaseError as e:
+        statuses, booked, summary_taken, error = [], None, None, str(e)
+    finally:
+        connection.rollback()
+        cursor.close()
+
+    expected = [status for _, _, status in SIGNUP_PLSQL_CASES]
+    check = {
+        "expected": expected,
+        "statuses": statuses,
+        "booked": booked,
+        "summary_taken": summary_taken,
+        "error": error,
+        "passed": statuses == expected and booked == summary_taken == 1,
+    }
+    detail = error or f"statuses {', '.join(map(str, statuses))}; booked {booked}, summary says {summary_taken}"
+    print(f"{'signup PL/SQL ' + label:<24} {detail}: {'PASS' if check['passed'] else 'FAIL'}")
+    return check
+
+
+def compare(current, baseline):
+    print(f"\nCompared with {baseline['meta'].get('timestamp', 'baseline')}:")
+    for name, stats in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("throughput_ops_per_sec", "p50_ms", "p95_ms"):
+            if before[key]:
+                deltas.append(f"{key} {100 * (stats[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {name:<24} " + "  ".join(deltas))
+
+
+def quiet_streamlit_logs():
+    """Bare-mode warnings (no ScriptRunContext, ...) would otherwise flood the output and the timings."""
+    for logger_name in list(logging.root.manager.loggerDict):
+        if logger_name.startswith("streamlit"):
+            logging.getLogger(logger_name).setLevel(logging.ERROR)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--instructors", type=int, default=50)
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--signups", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions (threads)")
+    parser.add_argument("--ops", type=int, default=200, help="Calls per scenario")
+    parser.add_argument("--browse-cache-ttl", type=float, default=None,
+                        help="Override BROWSE_CACHE_TTL (0 disables the browse cache)")
+    parser.add_argument("--query-cache-ttl", type=float, default=None,
+                        help="Override QUERY_CACHE_TTL (0 disables the ad-hoc query cache)")
+    parser.add_argument("--round-trip-ms", type=float, default=0.0,
+                        help="Simulated network latency added to every stand-in round trip")
+    parser.add_argument("--no-async", action="store_true",
+                        help="Run independent page queries one after another instead of on the asyncio pool")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Route signup_for_activity through the write-behind batching queue")
+    parser.add_argument("--oracle-dsn", metavar="USER/PASSWORD@HOST:PORT/SERVICE",
+                        help="Also run the real SIGNUP_PLSQL block against this Oracle schema (changes are rolled back)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Print changes against an earlier results file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="club_bench_")
+    db_path = os.path.join(workdir, "club.sqlite")
+    create_database(db_path, args.seed, args.members, args.instructors, args.activities, args.signups)
+
+    pools = []
+    emulations = {}  # Shared by every pool, including the one the script_rerun runs create
+
+    def create_pool(**kwargs):
+        pool = StandInPool(db_path, size=kwargs.get("max") or 8,
+                           acquire_timeout=(kwargs.get("wait_timeout") or 5000) / 1000,
+                           round_trip_callback=kwargs.get("round_trip_callback"),
+                           round_trip_delay=args.round_trip_ms / 1000)
+        pool.emulations = emulations
+        pools.append(pool)
+        return pool
+
+    oracledb.create_pool = create_pool  # The app's get_db_pool() now builds the stand-in
+    oracledb.create_pool_async = lambda **kwargs: StandInAsyncPool(create_pool(**kwargs))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import recreation_club as rc
+    quiet_streamlit_logs()
+    count_shown_errors(rc.st)
+    rc.SIGNUP_WRITE_BEHIND = args.write_behind
+    rc.ASYNC_POOL = rc.ASYNC_POOL and not args.no_async
+    if args.browse_cache_ttl is not None:
+        rc.get_browse_cache().ttl = args.browse_cache_ttl
+    if args.query_cache_ttl is not None:
+        rc.get_query_cache().ttl = args.query_cache_ttl
+
+    emulations[rc.SIGNUP_PLSQL] = signup_block
+    emulations[rc.SEAT_COUNT_RECONCILE_STATEMENTS[0]] = seat_count_merge
+    pool = rc.get_db_pool()
+    schema_error = rc.get_required_schema().ensure()
+    if schema_error:
+        raise SystemExit(schema_error)
+    rc.get_id_allocator()  # Reconciles the sequences up front, as main() does
+
+    rng = random.Random(args.seed)
+    run_id = int(time.time())
+    locations = [None, "Main Hall", "Studio A", "Pool"]
+    query = "SELECT s.signupid, s.memberid, s.activityid, s.signup_date FROM SignUp s"
+
+    def reload_reference_data(i):
+        rc.get_reference_data().invalidate()
+        return rc.get_reference_data().get()
+
+    def export(query, fmt):
+        export_file, rows_written, truncated = rc.export_custom_query(query, fmt)
+        if export_file is None:
+            return None
+        export_file.close()
+        return rows_written, truncated
+
+    def create_activity(i):
+        hour = rng.randint(7, 20)
+        return rc.create_activity(f"Bench {i}", date.today() + timedelta(days=rng.randint(0, 365)), time_of_day(hour),
+                                  time_of_day(hour + 1), 20, rng.choice(locations[1:]), 10, rng.randint(1, args.instructors))
+
+    def create_activity_series(i):
+        hour = rng.randint(7, 20)
+        first = date.today() + timedelta(days=rng.randint(0, 365))
+        return rc.create_activity_series(f"Bench series {i}", first, first + timedelta(weeks=11), [first.weekday()],
+                                         time_of_day(hour), time_of_day(hour + 1), 20, rng.choice(locations[1:]), 10,
+                                         rng.randint(1, args.instructors))
+
+    scenarios = {
+        "signup_new_member": lambda i: rc.signup_new_member(
+            "Bench", f"User{i}", "F", "555-123-4567", f"bench{run_id}_{i}@club.test"),
+        "signup_for_activity": lambda i: rc.signup_for_activity(
+            "Bench", f"member{rng.randint(1, args.members)}@club.test", rng.randint(1, args.activities)),
+        "browse_activities": lambda i: rc.browse_activities(
+            start_date=date.today() - timedelta(days=rng.randint(0, 365)), location=rng.choice(locations)),
+        "generate_signup_report": lambda i: rc.generate_signup_report(
+            start_date=date.today() - timedelta(days=rng.randint(1, 60))),
+        "create_activity": create_activity,
+        "create_activity_series": create_activity_series,
+        "reference_data": reload_reference_data,
+        "execute_custom_query": lambda i: rc.execute_custom_query(query),
+        "export_csv": lambda i: export(query, "csv"),
+        "export_xlsx": lambda i: export(query, "xlsx"),
+    }
+    heavy = {"export_csv", "export_xlsx", "generate_signup_report", "create_activity_series"}
+
+    print(f"Stand-in database: {db_path}")
+    results = {"scenarios": {}, "checks": {}}
+    for name, operation in scenarios.items():
+        ops = max(1, args.ops // 10) if name in heavy else args.ops
+        results["scenarios"][name] = run_scenario(name, operation, args.sessions, ops)
+    results["scenarios"]["script_rerun"] = run_scenario(
+        "script_rerun", rerun_operation(os.path.abspath(rc.__file__)), 1, max(1, args.ops // 10))
+    results["checks"]["no_overbooking"] = overbooking_check(rc, pool, args.sessions)
+    connection = pool.acquire()
+    try:
+        results["checks"]["signup_plsql_emulation"] = signup_plsql_check(rc, connection, "(stand-in)")
+    finally:
+        connection.close()
+    if args.oracle_dsn:
+        with oracledb.connect(dsn=args.oracle_dsn) as connection:
+            results["checks"]["signup_plsql_oracle"] = signup_plsql_check(rc, connection, "(Oracle)")
+
+    round_trips = rc.get_metrics().summary()
+    if not round_trips.empty and "round_trips p50" in round_trips:
+        results["round_trips_p50"] = dict(zip(round_trips["Operation"], round_trips["round_trips p50"].astype(float)))
+
+    results["meta"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2, default=str)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+    if not all(check["passed"] for check in results["checks"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,30 @@
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 import oracledb  # Use python-oracledb instead of cx_Oracle
-from datetime import datetime, timedelta
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import csv
+import functools
+import inspect
 import io
+import logging
+import os
+import queue
 import re  # For input validation
+import tempfile
+import threading
+import time
+import uuid
 from datetime import datetime
 
+SCRIPT_STARTED = time.perf_counter()  # Start of this (re)run, for the script_rerun timing
+
 # Streamlit page configuration
 st.set_page_config(
     page_title="Club Activity Sign-up",
@@ -13,10 +32,13 @@ st.set_page_config(
     layout="wide",
 )
 
+# Validation patterns, compiled once and shared by the single and bulk sign-up paths
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
+PHONE_PATTERN = re.compile(r'^(\(\d{3}\)\s*|\d{3}[-\.\s]?)?\d{3}[-\.\s]?\d{4}$')
+
 # Helper function for email validation
 def is_valid_email(email):
-    pattern = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-    return re.match(pattern, email)
+    return EMAIL_PATTERN.match(email)
 
 # Helper function for phone number validation (simple numeric check)
 def is_valid_phone(phone):
@@ -28,8 +50,7 @@ def is_valid_phone(phone):
     - (555) 123-4567
     - 1234567890 (only digits)
     """
-    pattern = r'^(\(\d{3}\)\s*|\d{3}[-\.\s]?)?\d{3}[-\.\s]?\d{4}$'
-    return re.match(pattern, phone)
+    return PHONE_PATTERN.match(phone)
 
 # Oracle Database Connection Details
 HOST_NAME = "imz409.ust.hk"
@@ -38,25 +59,790 @@ SERVICE_NAME = "imz409"
 USERNAME = "sliangax"
 PASSWORD = "3976"
 
-# Function to connect to Oracle Database using python-oracledb in Thin mode
-def get_db_connection():
+# Connection pool settings
+POOL_MIN = 1  # Sessions opened when the pool is created
+POOL_MAX = 8  # Upper bound on concurrent sessions across all Streamlit sessions
+POOL_INCREMENT = 1  # Sessions added each time the pool grows
+ASYNC_POOL_MIN = 0  # Sessions the asyncio pool opens up front (it only serves batches of page queries)
+ASYNC_POOL_MAX = 3  # Its own cap, so a process holds at most POOL_MAX + ASYNC_POOL_MAX sessions
+POOL_ACQUIRE_TIMEOUT = 5  # Seconds to wait for a free session before giving up
+POOL_STMT_CACHE_SIZE = 40  # Statements cached per session (skips re-parsing on reuse)
+
+# Circuit breaker settings for connection acquisition
+BREAKER_FAILURE_THRESHOLD = 3  # Consecutive failed acquisitions that open the breaker
+BREAKER_COOL_DOWN = 30  # Seconds the open breaker fails fast before letting one probe through
+
+# Instrumentation settings
+METRICS_WINDOW = 1000  # Recent calls kept per operation for the p50/p95/p99 figures
+SLOW_QUERY_SECONDS = 1.0  # Statements slower than this are logged with their SQL and bind names
+METRICS_FILE = "club_metrics.prom"  # Prometheus text-format snapshot, picked up by node_exporter's textfile collector
+METRICS_FILE_INTERVAL = 15  # Minimum seconds between snapshot rewrites
+METRIC_MEASURES = ["total", "acquire", "execute", "fetch", "dataframe", "render", "round_trips", "rows", "bytes"]
+
+logger = logging.getLogger("recreation_club")
+
+# (operation, stats) of the data function currently running in this thread, if any
+current_call = contextvars.ContextVar("current_call", default=None)
+
+# Add `amount` to a measure of the data function currently running (no-op outside instrumented calls)
+def record_measure(measure, amount):
+    call = current_call.get()
+    if call is not None:
+        call[1][measure] += amount
+
+# Time a block of work as one phase ("dataframe", "render", ...) of the current call
+@contextlib.contextmanager
+def timed_phase(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_measure(phase, time.perf_counter() - start)
+
+# Per-operation latency/volume samples, summarised as percentiles
+class Metrics:
+    def __init__(self, window=METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: {measure: deque(maxlen=window) for measure in METRIC_MEASURES})
+        self._totals = defaultdict(lambda: defaultdict(float))  # Lifetime counters for Prometheus
+        self._written_at = 0.0
+
+    def record(self, operation, stats):
+        with self._lock:
+            samples = self._samples[operation]
+            totals = self._totals[operation]
+            totals["calls"] += 1
+            for measure in METRIC_MEASURES:
+                samples[measure].append(stats[measure])
+                totals[measure] += stats[measure]
+            write_due = time.monotonic() - self._written_at >= METRICS_FILE_INTERVAL
+            if write_due:
+                self._written_at = time.monotonic()
+        if write_due:
+            self.write_prometheus(METRICS_FILE)
+
+    def summary(self):
+        rows = []
+        with self._lock:
+            for operation, samples in sorted(self._samples.items()):
+                row = {"Operation": operation, "Calls": int(self._totals[operation]["calls"])}
+                for measure in METRIC_MEASURES:
+                    values = pd.Series(samples[measure], dtype=float)
+                    p50, p95, p99 = values.quantile([0.5, 0.95, 0.99]) if not values.empty else (0, 0, 0)
+                    if measure in ("round_trips", "rows", "bytes"):
+                        row[f"{measure} p50"], row[f"{measure} p95"] = p50, p95
+                    elif values.any():
+                        row[f"{measure} p50 (ms)"] = round(p50 * 1000, 1)
+                        row[f"{measure} p95 (ms)"] = round(p95 * 1000, 1)
+                        row[f"{measure} p99 (ms)"] = round(p99 * 1000, 1)
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP club_operation_seconds Latency of recreation_club data functions by phase.",
+            "# TYPE club_operation_seconds summary",
+        ]
+        counters = []
+        with self._lock:
+            for operation, samples in sorted(self._samples.items()):
+                totals = self._totals[operation]
+                for phase in ("total", "acquire", "execute", "fetch", "dataframe", "render"):
+                    values = pd.Series(samples[phase], dtype=float)
+                    labels = f'operation="{operation}",phase="{phase}"'
+                    for quantile in (0.5, 0.95, 0.99):
+                        value = values.quantile(quantile) if not values.empty else 0.0
+                        lines.append(f'club_operation_seconds{{{labels},quantile="{quantile}"}} {value:.6f}')
+                    lines.append(f"club_operation_seconds_sum{{{labels}}} {totals[phase]:.6f}")
+                    lines.append(f"club_operation_seconds_count{{{labels}}} {int(totals['calls'])}")
+                for measure in ("round_trips", "rows", "bytes"):
+                    counters.append((measure, operation, totals[measure]))
+        for measure in ("round_trips", "rows", "bytes"):
+            lines.append(f"# TYPE club_operation_{measure}_total counter")
+            lines.extend(
+                f'club_operation_{measure}_total{{operation="{operation}"}} {int(value)}'
+                for name, operation, value in counters if name == measure
+            )
+        return "\n".join(lines) + "\n"
+
+    # Write the snapshot atomically so a scraper never reads a half-written file
+    def write_prometheus(self, path):
+        try:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w") as metrics_file:
+                metrics_file.write(self.prometheus_text())
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", path, e)
+
+@st.cache_resource
+def get_metrics():
+    return Metrics()
+
+# Decorator for data functions: collects per-call timings/volumes and records them under `operation`.
+# Nested instrumented calls are folded into the outermost one.
+def instrumented(operation):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current_call.get() is not None:
+                return func(*args, **kwargs)
+
+            stats = defaultdict(float)
+            token = current_call.set((operation, stats))
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats["total"] = time.perf_counter() - start
+                current_call.reset(token)
+                get_metrics().record(operation, stats)
+        return wrapper
+    return decorator
+
+# Called by python-oracledb before every Thin mode round trip (drivers that support it)
+def count_round_trip(name):
+    record_measure("round_trips", 1)
+
+ROUND_TRIP_HOOK = "round_trip_callback" in inspect.signature(oracledb.create_pool).parameters
+
+# Cursor wrapper that times execute/fetch calls and logs slow statements
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def _execute(self, method, statement, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(statement, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_measure("execute", elapsed)
+            if not ROUND_TRIP_HOOK:
+                record_measure("round_trips", 1)
+            if elapsed >= SLOW_QUERY_SECONDS:
+                call = current_call.get()
+                try:
+                    bind_names = self._cursor.bindnames()
+                except Exception:
+                    bind_names = []
+                logger.warning("Slow query in %s (%.2fs): %s | binds: %s",
+                               call[0] if call else "-", elapsed, " ".join(statement.split()), bind_names)
+
+    def execute(self, statement, *args, **kwargs):
+        return self._execute(self._cursor.execute, statement, *args, **kwargs)
+
+    def executemany(self, statement, *args, **kwargs):
+        return self._execute(self._cursor.executemany, statement, *args, **kwargs)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            result = method(*args)
+        finally:
+            record_measure("fetch", time.perf_counter() - start)
+        if result is not None:
+            record_measure("rows", len(result) if isinstance(result, list) else 1)
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+# Connection wrapper handing out instrumented cursors; everything else goes to the real connection
+class InstrumentedConnection:
+    def __init__(self, connection):
+        object.__setattr__(self, "_connection", connection)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._connection, name)
+        if name == "fetch_df_all":  # Only present on drivers with DataFrame support
+            return functools.partial(self._fetch_df_all, attribute)
+        return attribute
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def cursor(self):
+        return InstrumentedCursor(self._connection.cursor())
+
+    def _fetch_df_all(self, fetch_df_all, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            oracle_df = fetch_df_all(*args, **kwargs)
+        finally:
+            record_measure("fetch", time.perf_counter() - start)
+            if not ROUND_TRIP_HOOK:
+                record_measure("round_trips", 1)
+        record_measure("rows", oracle_df.num_rows())
+        return oracle_df
+
+# Process-wide session pool, shared by every Streamlit session and rerun
+@st.cache_resource
+def get_db_pool():
+    dsn = oracledb.makedsn(HOST_NAME, PORT_NUMBER, service_name=SERVICE_NAME)
+    hooks = {"round_trip_callback": count_round_trip} if ROUND_TRIP_HOOK else {}
+    return oracledb.create_pool(
+        user=USERNAME,
+        password=PASSWORD,
+        dsn=dsn,
+        min=POOL_MIN,
+        max=POOL_MAX,
+        increment=POOL_INCREMENT,
+        getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+        wait_timeout=POOL_ACQUIRE_TIMEOUT * 1000,
+        stmtcachesize=POOL_STMT_CACHE_SIZE,
+        **hooks,
+    )
+
+# Error codes (or code prefixes) from acquiring or pinging a session that mean the database cannot be
+# reached: connect/listener failures, TNS errors, an instance that is down or starting, a dropped link.
+# Anything else, DPY-4005 (timed out waiting for a free pooled session) above all, is load, not an outage.
+OUTAGE_ERROR_CODES = ("DPY-6", "DPY-4011", "ORA-12", "ORA-01033", "ORA-01034", "ORA-01089", "ORA-03113", "ORA-03114")
+
+def is_outage(error):
+    if isinstance(error, OSError):  # Host unresolvable/unreachable
+        return True
+    error_obj = error.args[0] if error.args else None
+    code = getattr(error_obj, "full_code", None) or str(error).split(":", 1)[0]
+    return code.startswith(OUTAGE_ERROR_CODES)
+
+# Circuit breaker for connection acquisition. After `threshold` consecutive failures it opens and
+# callers fail at once instead of each waiting out the connect timeout. Once `cool_down` seconds
+# have passed, the next caller is let through as a probe (half-open): success closes the breaker,
+# failure re-opens it for another cool-down. Callers that get a probe call end_probe() in a finally,
+# so a probe that ends any other way (timeout, cancellation, ...) hands the probe to the next caller.
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, cool_down=BREAKER_COOL_DOWN):
+        self.threshold = threshold
+        self.cool_down = cool_down
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.last_error = None
+        self._opened_at = 0.0
+        self._probe_thread = None  # Thread holding the half-open probe
+
+    # True if the caller may try the database; the first caller after the cool-down becomes the probe
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cool_down:
+                self.state = "half-open"
+                self._probe_thread = threading.get_ident()
+                return True
+            return False
+
+    # Call after any allow() that returned True: if this thread's probe recorded neither a success nor a
+    # failure, re-open the breaker with the cool-down already spent, so the next caller probes instead
+    def end_probe(self):
+        with self._lock:
+            if self.state == "half-open" and self._probe_thread == threading.get_ident():
+                self.state = "open"
+                self._opened_at = time.monotonic() - self.cool_down
+
+    # True while callers are being turned away, without claiming the probe (reads use it to pick stale data)
+    def rejecting(self):
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self._opened_at < self.cool_down
+            return self.state == "half-open"
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.warning("Database circuit breaker closed again")
+            self.state = "closed"
+            self.failures = 0
+
+    # Only failures that mean the database cannot be reached count; see is_outage()
+    def record_failure(self, error):
+        with self._lock:
+            if not is_outage(error):
+                if self.state == "half-open":
+                    self.state = "open"  # The probe proved nothing; let the next caller probe instead
+                    self._opened_at = time.monotonic() - self.cool_down
+                return
+            self.failures += 1
+            self.last_error = error
+            if self.state == "half-open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning("Database circuit breaker opened after %d failures: %s", self.failures, error)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def message(self):
+        with self._lock:
+            retry_in = max(0, self.cool_down - (time.monotonic() - self._opened_at))
+            return (f"Database unavailable after {self.failures} failed connection attempts "
+                    f"(last error: {self.last_error}). Retrying in {retry_in:.0f}s.")
+
+@st.cache_resource
+def get_circuit_breaker():
+    return CircuitBreaker()
+
+# Read helper while the breaker is open: `stored_at` is when the data being shown was fetched
+def warn_stale(stored_at):
+    st.warning(f"Showing data from {stored_at:%H:%M:%S}, which may be out of date. {get_circuit_breaker().message()}")
+
+# Function to borrow a connection from the pool (python-oracledb Thin mode).
+# Calling close() on the returned connection hands it back to the pool.
+# While the circuit breaker is open this fails immediately instead of waiting on the network.
+# Failures are shown with st.error; background threads have no page to show them on and pass
+# `report` (e.g. logger.warning) instead.
+def get_db_connection(report=None):
+    report = report or st.error
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        report(breaker.message())
+        return None
+
+    start = time.perf_counter()
+    try:
+        connection = get_db_pool().acquire()
+        breaker.record_success()
+    except (oracledb.DatabaseError, OSError) as e:  # OSError: host unresolvable/unreachable
+        breaker.record_failure(e)
+        report(f"Database connection failed: {str(e)}")
+        return None
+    finally:
+        record_measure("acquire", time.perf_counter() - start)
+        breaker.end_probe()
+    return InstrumentedConnection(connection)
+
+ASYNC_POOL = hasattr(oracledb, "create_pool_async")  # python-oracledb 2.0+ (Thin mode asyncio API)
+ASYNC_QUERY_TIMEOUT = 30  # Seconds a script run waits for a batch of concurrent queries
+
+# Event loop on a daemon thread, owning an asyncio session pool. Streamlit scripts are synchronous,
+# so they hand a batch of independent queries to the loop and block until all of them are back:
+# each query borrows its own session, and the batch takes as long as its slowest query.
+class AsyncDatabase:
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.loop = asyncio.new_event_loop()
+        self._pool = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="oracledb-async", daemon=True)
+        self._thread.start()
+
+    # The pool is created on the loop thread, the only thread that ever touches it
+    def _get_pool(self):
+        if self._pool is None:
+            dsn = oracledb.makedsn(HOST_NAME, PORT_NUMBER, service_name=SERVICE_NAME)
+            hooks = {"round_trip_callback": count_round_trip} if ROUND_TRIP_HOOK else {}
+            self._pool = oracledb.create_pool_async(
+                user=USERNAME,
+                password=PASSWORD,
+                dsn=dsn,
+                min=ASYNC_POOL_MIN,
+                max=ASYNC_POOL_MAX,
+                increment=POOL_INCREMENT,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=POOL_ACQUIRE_TIMEOUT * 1000,
+                stmtcachesize=POOL_STMT_CACHE_SIZE,
+                **hooks,
+            )
+        return self._pool
+
+    async def _fetch(self, query, params):
+        start = time.perf_counter()
+        try:
+            connection = await self._get_pool().acquire()
+        except (oracledb.DatabaseError, OSError) as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        record_measure("acquire", time.perf_counter() - start)
+        try:
+            start = time.perf_counter()
+            rows = await connection.fetchall(query, params or {}, arraysize=FETCH_BATCH_SIZE)
+            record_measure("execute", time.perf_counter() - start)
+        finally:
+            await connection.close()
+        if not ROUND_TRIP_HOOK:
+            record_measure("round_trips", 1)
+        record_measure("rows", len(rows))
+        return rows
+
+    # Runs on the loop; the caller's metrics context is set first so every task created by gather() inherits it
+    async def _gather(self, call, queries):
+        current_call.set(call)
+        return await asyncio.gather(*(self._fetch(query, params) for query, params in queries))
+
+    def fetch_all(self, queries):
+        future = asyncio.run_coroutine_threadsafe(self._gather(current_call.get(), queries), self.loop)
+        try:
+            return future.result(ASYNC_QUERY_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+@st.cache_resource
+def get_async_db():
+    return AsyncDatabase(get_circuit_breaker())
+
+# Run independent queries concurrently and return their rows by name.
+# `queries` maps a name to (query, params). Without the asyncio driver they run one after another
+# on a single pooled connection instead. Database errors are raised to the caller.
+def fetch_concurrently(queries):
+    names = list(queries)
+    if ASYNC_POOL:
+        breaker = get_circuit_breaker()
+        if not breaker.allow():
+            raise oracledb.DatabaseError(breaker.message())
+        try:
+            results = get_async_db().fetch_all([queries[name] for name in names])
+        finally:
+            breaker.end_probe()  # The batch may time out or be cancelled before any acquire is recorded
+        return dict(zip(names, results))
+
+    connection = get_db_connection()
+    if not connection:
+        raise oracledb.DatabaseError("Database connection failed.")
+    cursor = connection.cursor()
     try:
-        dsn = oracledb.makedsn(HOST_NAME, PORT_NUMBER, service_name=SERVICE_NAME)
-        connection = oracledb.connect(user=USERNAME, password=PASSWORD, dsn=dsn)
-        return connection
-    except oracledb.DatabaseError as e:
-        st.error(f"Database connection failed: {str(e)}")
+        cursor.arraysize = FETCH_BATCH_SIZE
+        results = {}
+        for name in names:
+            query, params = queries[name]
+            cursor.execute(query, params or {})
+            results[name] = cursor.fetchall()
+        return results
+    finally:
+        cursor.close()
+        connection.close()
+
+# Sequences used for primary keys, with the table/column each one feeds
+ID_SEQUENCES = {
+    "member_seq": ("Member", "memberid"),
+    "signups_seq": ("SignUp", "signupid"),
+    "activity_seq": ("Activity", "activityid"),
+}
+ID_BLOCK_SIZE = 20  # IDs fetched from a sequence per round trip
+
+# Shared ID allocator for Member, SignUp and Activity.
+# Sequences are reconciled against MAX(id) when the allocator is created (or on demand),
+# then IDs are handed out from blocks pulled with a single NEXTVAL query.
+class IdAllocator:
+    def __init__(self, block_size=ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {sequence: [] for sequence in ID_SEQUENCES}
+
+    # Bring a sequence back ahead of its table if rows were inserted with manual IDs.
+    # ALTER SEQUENCE is DDL (implicit commit), so this only runs at startup or when asked, and always
+    # on a connection of its own: inside a write it would commit and release the caller's row locks.
+    def reconcile(self, connection, sequence=None):
+        sequences = [sequence] if sequence else list(ID_SEQUENCES)
+        with self._lock:
+            for name in sequences:
+                self._reconcile(connection, name)
+
+    def _reconcile(self, connection, sequence):
+        table, column = ID_SEQUENCES[sequence]
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT (SELECT MAX({column}) FROM {table}), {sequence}.NEXTVAL FROM dual")
+            max_id, current_seq_value = cursor.fetchone()
+            max_id = max_id or 0
+            if current_seq_value <= max_id:
+                cursor.execute(f"ALTER SEQUENCE {sequence} RESTART START WITH {max_id + 1}")
+            # Any IDs still cached from before the check may collide, so drop them
+            self._blocks[sequence] = []
+        finally:
+            cursor.close()
+
+    # Return `count` fresh IDs from `sequence`, costing at most one round trip
+    def next_ids(self, connection, sequence, count=1):
+        with self._lock:
+            block = self._blocks[sequence]
+            if len(block) < count:
+                needed = max(count - len(block), self.block_size)
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(f"SELECT {sequence}.NEXTVAL FROM dual CONNECT BY LEVEL <= :n", n=needed)
+                    block.extend(row[0] for row in cursor.fetchall())
+                finally:
+                    cursor.close()
+
+            ids = block[:count]
+            del block[:count]
+            return ids
+
+    def next_id(self, connection, sequence):
+        return self.next_ids(connection, sequence, 1)[0]
+
+# Created (and its sequences reconciled, on a dedicated connection) on the first run in each process
+@st.cache_resource
+def get_id_allocator():
+    allocator = IdAllocator()
+    connection = get_db_connection()
+    if connection:
+        try:
+            allocator.reconcile(connection)
+        except oracledb.DatabaseError as e:
+            logger.warning("Could not reconcile ID sequences at startup: %s", e)
+        finally:
+            connection.close()
+    return allocator
+
+# Re-check every ID sequence against its table (admin "on demand" reconciliation)
+@instrumented("reconcile_id_sequences")
+def reconcile_id_sequences():
+    connection = get_db_connection()
+    if not connection:
+        return "Database connection failed."
+
+    try:
+        get_id_allocator().reconcile(connection)
+        return "ID sequences reconciled."
+    except Exception as e:
+        return f"Failed to reconcile ID sequences: {e}"
+    finally:
+        connection.close()
+
+BROWSE_CACHE_TTL = 60  # Seconds a cached "Browse Activities" result stays fresh
+RESULT_CACHE_MAX_ENTRIES = 500  # Fresh results kept per cache, least recently used evicted first
+RESULT_CACHE_MAX_STALE = 100  # Expired results kept per cache as last-known-good copies for outages
+
+# Small thread-safe TTL cache shared across Streamlit sessions, with hit/miss counters.
+# Fresh entries form an LRU bounded by max_entries. Entries that expire, are invalidated or are evicted
+# move to a second, smaller LRU of last-known-good copies that only get_stale() reads.
+class ResultCache:
+    def __init__(self, ttl, max_entries=RESULT_CACHE_MAX_ENTRIES, max_stale=RESULT_CACHE_MAX_STALE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, value, stored_at_wall), least recently used first
+        self._stale = OrderedDict()  # key -> (stored_at, value, stored_at_wall), oldest first
+
+    def _retire(self, key, entry):
+        self._stale[key] = entry
+        self._stale.move_to_end(key)
+        while len(self._stale) > self.max_stale:
+            self._stale.popitem(last=False)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if now - entry[0] >= self.ttl]:
+            self._retire(key, self._entries.pop(key))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._retire(key, self._entries.pop(key))
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._stale.pop(key, None)
+            self._entries[key] = (time.monotonic(), value, datetime.now())
+            self._entries.move_to_end(key)
+            self._purge_expired()
+            while len(self._entries) > self.max_entries:
+                self._retire(*self._entries.popitem(last=False))
+
+    # Last value stored under `key` however old, as (value, stored_at_wall), or None.
+    # Only for serving something while the database is unreachable.
+    def get_stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key) or self._stale.get(key)
+            return (entry[1], entry[2]) if entry is not None else None
+
+    # Expire every entry; called by writes so readers never see stale rows
+    def invalidate(self):
+        with self._lock:
+            while self._entries:
+                self._retire(*self._entries.popitem(last=False))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "stale": len(self._stale)}
+
+# While the circuit breaker is turning callers away, answer a cache miss with the last value stored
+# under `key` (flagged as stale on the page). Returns None when the database should be tried.
+def stale_fallback(cache, key):
+    if not get_circuit_breaker().rejecting():
+        return None
+    stale = cache.get_stale(key)
+    if stale is None:
         return None
+    warn_stale(stale[1])
+    return stale[0]
 
-# Try to connect to the database
-connection = get_db_connection()
-if connection:
-    st.success("Successfully connected to Oracle Database!")
-    connection.close()
-else:
-    st.error("Failed to connect to the database.")
+@st.cache_resource
+def get_browse_cache():
+    return ResultCache(BROWSE_CACHE_TTL)
+
+FETCH_BATCH_SIZE = 1000  # Rows per network fetch when building DataFrames
+
+# Run a query straight into a pandas DataFrame.
+# Uses python-oracledb's Arrow-backed fetch_df_all() when it (and pyarrow) is available,
+# otherwise falls back to fetchmany() chunks so rows are never unpacked one at a time.
+def fetch_dataframe(connection, query, params=None, columns=None):
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+
+    if pyarrow is not None and hasattr(connection, "fetch_df_all"):
+        oracle_df = connection.fetch_df_all(statement=query, parameters=params, arraysize=FETCH_BATCH_SIZE)
+        with timed_phase("dataframe"):
+            df = pyarrow.table(oracle_df).to_pandas()
+    else:
+        cursor = connection.cursor()
+        try:
+            cursor.arraysize = FETCH_BATCH_SIZE
+            cursor.execute(query, params or {})
+            names = [col[0] for col in cursor.description]
+            chunks = []
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                with timed_phase("dataframe"):
+                    chunks.append(pd.DataFrame(rows, columns=names))
+            with timed_phase("dataframe"):
+                df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=names)
+        finally:
+            cursor.close()
+
+    if columns is not None:
+        df.columns = columns
+    return df
+
+# Format a date/timestamp column as text in one vectorized pass
+def format_datetime_column(series, fmt):
+    return pd.to_datetime(series).dt.strftime(fmt)
+
+# Optional supporting schema objects: indexes for keyset browsing (activity_date, activityid) and its
+# filters. Applied once from the admin Maintenance panel; re-running is harmless.
+# Tables the app needs to run at all are in REQUIRED_SCHEMA instead.
+SCHEMA_UPGRADES = [
+    "CREATE INDEX activity_date_id_ix ON Activity (activity_date, activityid)",
+    "CREATE INDEX activity_location_date_ix ON Activity (location, activity_date, activityid)",
+    "CREATE INDEX instructoractivity_instructor_ix ON InstructorActivity (instructorid, activityid)",
+    "CREATE INDEX signup_activity_ix ON SignUp (activityid)",
+]
+ALREADY_EXISTS_ERRORS = (955, 1408, 2260, 2261, 2275)  # Name in use, columns already indexed/constrained
+
+# Run each SCHEMA_UPGRADES statement, skipping objects that already exist
+@instrumented("apply_schema_upgrades")
+def apply_schema_upgrades():
+    connection = get_db_connection()
+    if not connection:
+        return ["Database connection failed."]
+
+    cursor = connection.cursor()
+    results = []
+    try:
+        for statement in SCHEMA_UPGRADES:
+            try:
+                cursor.execute(statement)
+                results.append(f"Applied: {statement}")
+            except oracledb.DatabaseError as e:
+                error, = e.args
+                if error.code in ALREADY_EXISTS_ERRORS:
+                    results.append(f"Already present: {statement}")
+                else:
+                    results.append(f"Failed: {statement} ({error.message})")
+    finally:
+        cursor.close()
+        connection.close()
+
+    return results
+
+HEALTH_CHECK_INTERVAL = 30  # Seconds one database health check is reused across reruns and sessions
+
+# Database reachability for the sidebar status line: at most one acquire + ping per interval
+# for the whole process, instead of a connect on every rerun
+class DatabaseHealth:
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._result = None
+
+    # Returns (healthy, message), re-checking only once the last result is older than the interval
+    def status(self):
+        with self._lock:
+            if self._checked_at is None or time.monotonic() - self._checked_at >= self.interval:
+                self._result = self._check()
+                self._checked_at = time.monotonic()
+            return self._result
+
+    def _check(self):
+        breaker = get_circuit_breaker()
+        if not breaker.allow():
+            return False, breaker.message()
+        try:
+            try:
+                connection = get_db_pool().acquire()
+            except (oracledb.DatabaseError, OSError) as e:
+                breaker.record_failure(e)
+                return False, f"Failed to connect to the database: {e}"
+            try:
+                connection.ping()
+            except (oracledb.DatabaseError, OSError) as e:
+                breaker.record_failure(e)
+                return False, f"Failed to connect to the database: {e}"
+            finally:
+                connection.close()
+            breaker.record_success()
+            return True, f"Database connected (checked {datetime.now():%H:%M:%S})."
+        finally:
+            breaker.end_probe()
+
+@st.cache_resource
+def get_database_health():
+    return DatabaseHealth()
+
+BANNER_URL = "https://images.unsplash.com/photo-1588286840104-8957b019727f?q=80&w=2940&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
+BANNER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "banner.jpg")  # Local copy of the banner
+
+# Banner image bytes, downloaded once into BANNER_FILE and then read from disk.
+# Falls back to the remote URL (fetched by the browser) when the download fails.
+@st.cache_resource(show_spinner=False)
+def get_banner():
+    if not os.path.exists(BANNER_FILE):
+        import urllib.request  # Only needed for the one-off download
+
+        try:
+            with urllib.request.urlopen(BANNER_URL, timeout=5) as response:
+                data = response.read()
+            os.makedirs(os.path.dirname(BANNER_FILE), exist_ok=True)
+            partial = f"{BANNER_FILE}.{os.getpid()}.tmp"
+            with open(partial, "wb") as banner:
+                banner.write(data)
+            os.replace(partial, BANNER_FILE)
+        except OSError as e:
+            logger.warning("Could not cache the banner image, using the remote URL: %s", e)
+            return BANNER_URL
+    with open(BANNER_FILE, "rb") as banner:
+        return banner.read()
 
 # Member Sign-up Function with Unique Email Validation
+@instrumented("signup_new_member")
 def signup_new_member(first_name, last_name, gender, phone, email):
     # Validate user inputs
     if not is_valid_email(email):
@@ -69,44 +855,39 @@ def signup_new_member(first_name, last_name, gender, phone, email):
     if not connection:
         return "Database connection failed."
 
+    email = email.strip()
     cursor = connection.cursor()
 
     try:
-        # Step 1: Check for existing email (unique email constraint)
-        cursor.execute("SELECT COUNT(*) FROM Member WHERE email = :email", email=email)
-        if cursor.fetchone()[0] > 0:
+        # Step 1: Check for existing email (case-insensitive; answered from the lookup cache when possible)
+        if lookup_member_id(connection, email) is not None:
             return "A member with this email already exists. Please use a different email."
 
-        # Step 2: Find the current maximum memberid in the Member table
-        cursor.execute("SELECT MAX(memberid) FROM Member")
-        max_memberid = cursor.fetchone()[0]  # Fetch the max memberid
-
-        if max_memberid is None:
-            max_memberid = 0  # If no members exist, set max_memberid to 0
-
-        # Step 3: Get the current next value of the member_seq sequence
-        cursor.execute("SELECT member_seq.NEXTVAL FROM dual")
-        current_seq_value = cursor.fetchone()[0]  # Fetch the next sequence value
-
-        # Step 4: If the sequence is behind, restart it with a value higher than max_memberid
-        if current_seq_value <= max_memberid:
-            new_value = max_memberid + 1
-            cursor.execute(f"ALTER SEQUENCE member_seq RESTART START WITH {new_value}")
-            connection.commit()  # Commit the sequence adjustment
+        # Step 2: Take the next memberid from the shared allocator (no MAX scan, no DDL)
+        member_id = get_id_allocator().next_id(connection, "member_seq")
 
-        # Step 5: Automatically calculate join_date, expire_date, and set status to 'active'
+        # Step 3: Automatically calculate join_date, expire_date, and set status to 'active'
         join_date = datetime.now()
         expire_date = datetime.now() + timedelta(days=365)  # Expire in 1 year
         status = 'active'
 
-        # Step 6: Insert the new member into the Members table using the adjusted sequence
+        # Step 4: Insert the new member into the Members table
         cursor.execute("""
             INSERT INTO Member (memberid, first_name, last_name, gender, phone, email, join_date, expire_date, status)
-            VALUES (member_seq.NEXTVAL, :first_name, :last_name, :gender, :phone, :email, :join_date, :expire_date, :status)
-        """, first_name=first_name, last_name=last_name, gender=gender, phone=phone, email=email, join_date=join_date, expire_date=expire_date, status=status)
+            VALUES (:member_id, :first_name, :last_name, :gender, :phone, :email, :join_date, :expire_date, :status)
+        """, member_id=member_id, first_name=first_name, last_name=last_name, gender=gender, phone=phone, email=email, join_date=join_date, expire_date=expire_date, status=status)
 
         # Commit the transaction
         connection.commit()
+        get_member_cache().put(email, member_id)
+
+    except oracledb.IntegrityError as e:
+        error, = e.args
+        # ORA-00001 on member_email_lower_ux: someone registered the same email just now.
+        # Other unique keys (a memberid clash after manual inserts) are real failures.
+        if error.code == 1 and "MEMBER_EMAIL_LOWER_UX" in error.message.upper():
+            return "A member with this email already exists. Please use a different email."
+        return f"Failed to sign up new member: {e}"
 
     except Exception as e:
         return f"Failed to sign up new member: {e}"
@@ -118,166 +899,1501 @@ def signup_new_member(first_name, last_name, gender, phone, email):
 
     return "New member successfully signed up!"
 
-# Activity Sign-up Function with Validation
-def signup_for_activity(member_name, email, activity_id):
-    if not is_valid_email(email):
-        return "Invalid email format."
+IMPORT_BATCH_SIZE = 1000  # Members inserted per executemany() call
+IMPORT_COLUMNS = ['first_name', 'last_name', 'gender', 'phone', 'email']
+ORACLE_IN_LIST_LIMIT = 32767  # Elements a SYS.ODCIVARCHAR2LIST can hold
+
+MEMBER_CACHE_SIZE = 20000  # Emails remembered by the email -> memberid lookup cache
+MEMBER_NEGATIVE_TTL = 30  # Seconds an "unknown email" answer is trusted (other app servers may register it)
+
+# Emails are matched case-insensitively everywhere; this is the key used for lookups and the cache
+def normalize_email(email):
+    return email.strip().lower()
+
+# Bounded LRU map from normalized email to memberid, shared across sessions.
+# Unknown emails are cached as None for MEMBER_NEGATIVE_TTL seconds so repeated typos don't hit the database.
+class MemberLookupCache:
+    MISSING = object()  # get() result when the email is not cached at all
+
+    def __init__(self, max_entries=MEMBER_CACHE_SIZE, negative_ttl=MEMBER_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # email -> (member_id or None, stored_at), least recently used first
+
+    def get(self, email):
+        key = normalize_email(email)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is None and time.monotonic() - entry[1] >= self.negative_ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return self.MISSING
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, email, member_id):
+        key = normalize_email(email)
+        with self._lock:
+            self._entries[key] = (member_id, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, emails=None):
+        with self._lock:
+            if emails is None:
+                self._entries.clear()
+            else:
+                for email in emails:
+                    self._entries.pop(normalize_email(email), None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+@st.cache_resource
+def get_member_cache():
+    return MemberLookupCache()
+
+# Return the subset of `emails` (normalized) already registered
+def find_existing_emails(connection, emails):
+    return set(find_member_ids(connection, emails, use_cache=False))
+
+# Map each registered email in `emails` (normalized) to its memberid.
+# Cached answers are used first; the rest take one set-based query per 32k emails, and are cached
+# unless `use_cache` is False (bulk imports would otherwise flush the cache with one-off emails).
+def find_member_ids(connection, emails, use_cache=True):
+    cache = get_member_cache()
+    member_ids = {}
+    wanted = []
+    for email in dict.fromkeys(normalize_email(email) for email in emails):
+        member_id = cache.get(email) if use_cache else cache.MISSING
+        if member_id is cache.MISSING:
+            wanted.append(email)
+        elif member_id is not None:
+            member_ids[email] = member_id
+
+    if wanted:
+        found = {}
+        list_type = connection.gettype("SYS.ODCIVARCHAR2LIST")
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(wanted), ORACLE_IN_LIST_LIMIT):
+                chunk = list_type.newobject(wanted[start:start + ORACLE_IN_LIST_LIMIT])
+                cursor.execute("SELECT LOWER(email), memberid FROM Member WHERE LOWER(email) IN (SELECT column_value FROM TABLE(:emails))", emails=chunk)
+                found.update(cursor.fetchall())
+        finally:
+            cursor.close()
+        if use_cache:
+            for email in wanted:
+                cache.put(email, found.get(email))
+        member_ids.update(found)
+    return member_ids
+
+# memberid for one email (case-insensitive), or None: a cache hit or a single index probe
+def lookup_member_id(connection, email):
+    cache = get_member_cache()
+    member_id = cache.get(email)
+    if member_id is not cache.MISSING:
+        return member_id
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT memberid FROM Member WHERE LOWER(email) = :email", email=normalize_email(email))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    member_id = row[0] if row else None
+    cache.put(email, member_id)
+    return member_id
+
+# Bulk member import from an uploaded CSV/xlsx DataFrame.
+# Returns (inserted_count, failures_df) where failures_df lists the spreadsheet row and reason for each rejected row.
+@instrumented("import_members")
+def import_members(members_df):
+    members_df = members_df.rename(columns=lambda col: str(col).strip().lower().replace(' ', '_'))
+    missing_columns = [col for col in IMPORT_COLUMNS if col not in members_df.columns]
+    if missing_columns:
+        return 0, pd.DataFrame({'Row': [None], 'Email': [None], 'Reason': [f"Missing columns: {', '.join(missing_columns)}"]})
+
+    members_df = members_df[IMPORT_COLUMNS].fillna('').astype(str).apply(lambda col: col.str.strip())
+    members_df['gender'] = members_df['gender'].str.upper()
+    members_df['row'] = members_df.index + 2  # Spreadsheet row number (row 1 is the header)
+
+    # Validate every row up front; the first failing check becomes the row's reason
+    reasons = pd.Series('', index=members_df.index)
+    checks = [
+        ((members_df[IMPORT_COLUMNS] == '').any(axis=1), "Missing required field."),
+        (~members_df['gender'].isin(['M', 'F']), "Gender must be M or F."),
+        (~members_df['email'].map(lambda email: bool(is_valid_email(email))), "Invalid email format."),
+        (~members_df['phone'].map(lambda phone: bool(is_valid_phone(phone))), "Invalid phone number format."),
+        (members_df['email'].str.lower().duplicated(keep='first'), "Duplicate email within the file."),
+    ]
+    for failed, reason in checks:
+        reasons[failed & (reasons == '')] = reason
 
     connection = get_db_connection()
     if not connection:
-        return "Database connection failed."
+        return 0, pd.DataFrame({'Row': [None], 'Email': [None], 'Reason': ["Database connection failed."]})
 
+    failures = []
+    inserted = 0
     cursor = connection.cursor()
+    try:
+        candidates = members_df[reasons == '']
+        existing = find_existing_emails(connection, candidates['email'].tolist())
+        reasons[members_df['email'].str.lower().isin(existing) & (reasons == '')] = "A member with this email already exists."
+        failures.extend(
+            {'Row': row, 'Email': email, 'Reason': reason}
+            for row, email, reason in zip(members_df['row'], members_df['email'], reasons)
+            if reason
+        )
+
+        valid = members_df[reasons == '']
+        join_date = datetime.now()
+        expire_date = join_date + timedelta(days=365)
+        allocator = get_id_allocator()
+
+        for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+            batch = valid.iloc[start:start + IMPORT_BATCH_SIZE]
+            member_ids = allocator.next_ids(connection, "member_seq", len(batch))
+            rows = [
+                (member_id, first_name, last_name, gender, phone, email, join_date, expire_date, 'active')
+                for member_id, first_name, last_name, gender, phone, email in zip(
+                    member_ids, batch['first_name'], batch['last_name'], batch['gender'], batch['phone'], batch['email']
+                )
+            ]
+            # batcherrors keeps going past bad rows (e.g. a constraint violation) and reports them afterwards
+            cursor.executemany("""
+                INSERT INTO Member (memberid, first_name, last_name, gender, phone, email, join_date, expire_date, status)
+                VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9)
+            """, rows, batcherrors=True)
+            batch_errors = cursor.getbatcherrors()
+            for error in batch_errors:
+                failed_row = batch.iloc[error.offset]
+                failures.append({'Row': failed_row['row'], 'Email': failed_row['email'], 'Reason': error.message})
+            inserted += len(rows) - len(batch_errors)
 
+        connection.commit()
+        if inserted:
+            get_member_cache().invalidate(valid['email'])  # Drops any cached "unknown email" answers
+
+    except Exception as e:
+        connection.rollback()
+        failures.append({'Row': None, 'Email': None, 'Reason': f"Import aborted: {e}"})
+        inserted = 0
+
+    finally:
+        cursor.close()
+        connection.close()
+
+    failures_df = pd.DataFrame(failures, columns=['Row', 'Email', 'Reason'])
+    return inserted, failures_df.sort_values('Row', na_position='first', ignore_index=True)
+
+# Capacity- and duplicate-checked sign-up for one activity, run as a single PL/SQL round trip.
+# Locking the Activity row serializes concurrent sign-ups for the same class, so the seat count
+# read here cannot go stale before the insert. Any other error is rolled back to the savepoint and
+# returned as the status (SQLERRM), so one bad row never fails the rest of an executemany() batch.
+# Positional binds, in order of first appearance:
+# :1 activity_id, :2 member_id, :3 signup_id, :4 signup_date, :5 status (OUT).
+# The benchmark's SQLite stand-in runs an emulation of this block (benchmark.signup_block), not the block
+# itself; only `benchmark.py --oracle-dsn ...` executes it. Change the two together.
+SIGNUP_PLSQL = """
+    DECLARE
+        v_capacity  Activity.capacity%TYPE;
+        v_taken     PLS_INTEGER;
+        v_mine      PLS_INTEGER;
+    BEGIN
+        SAVEPOINT signup_row;
+        SELECT capacity INTO v_capacity FROM Activity WHERE activityid = :1 FOR UPDATE;
+        SELECT COUNT(*) INTO v_mine FROM SignUp WHERE activityid = :1 AND memberid = :2;
+        BEGIN
+            SELECT taken INTO v_taken FROM ActivitySignupCount WHERE activityid = :1;
+        EXCEPTION
+            WHEN NO_DATA_FOUND THEN
+                -- Activity not yet in the summary: count once and start tracking it
+                SELECT COUNT(*) INTO v_taken FROM SignUp WHERE activityid = :1;
+                INSERT INTO ActivitySignupCount (activityid, taken) VALUES (:1, v_taken);
+        END;
+        IF v_mine = 0 AND v_taken < v_capacity THEN
+            INSERT INTO SignUp (signupid, memberid, activityid, signup_date)
+            VALUES (:3, :2, :1, :4);
+            UPDATE ActivitySignupCount SET taken = taken + 1 WHERE activityid = :1;
+            :5 := 'ok';
+        ELSIF v_mine > 0 THEN
+            :5 := 'duplicate';
+        ELSE
+            :5 := 'full';
+        END IF;
+    EXCEPTION
+        WHEN NO_DATA_FOUND THEN
+            :5 := 'missing';
+        WHEN OTHERS THEN
+            ROLLBACK TO signup_row;
+            :5 := SQLERRM;
+    END;
+"""
+SIGNUP_STATUS_SIZE = 512  # Long enough for any SQLERRM text
+SIGNUP_STATUS_MESSAGES = {
+    'ok': "Signed up.",
+    'full': "Activity is full.",
+    'duplicate': "Already signed up for this activity.",
+    'missing': "Activity not found.",
+}
+
+# Run SIGNUP_PLSQL once per (activity_id, member_id, signup_id, signup_date) row in one executemany().
+# Returns the raw :5 status of each row. Commits only if the caller turned on autocommit.
+def execute_signup_block(cursor, rows):
+    status_var = cursor.var(str, size=SIGNUP_STATUS_SIZE, arraysize=len(rows))
+    cursor.setinputsizes(None, None, None, None, status_var)
+    cursor.executemany(SIGNUP_PLSQL, rows)
+    return [status_var.getvalue(offset) for offset in range(len(rows))]
+
+# Run SIGNUP_PLSQL for every (activity_id, member_id) pair in one executemany() round trip that also commits.
+# Returns one result message per pair, in the order given: a SIGNUP_STATUS_MESSAGES text or an ORA- error.
+# (batcherrors is only allowed for DML, so per-row errors come back through the status bind instead.)
+def apply_signups(connection, pairs):
+    order = sorted(range(len(pairs)), key=lambda index: pairs[index][0])  # Lock activities in a fixed order so batches can't deadlock
+    signup_ids = get_id_allocator().next_ids(connection, "signups_seq", len(pairs))
+    signup_date = datetime.now()
+    rows = [(pairs[index][0], pairs[index][1], signup_id, signup_date) for index, signup_id in zip(order, signup_ids)]
+
+    cursor = connection.cursor()
     try:
-        cursor.execute("SELECT memberid FROM Member WHERE email = :email", email=email)
-        member = cursor.fetchone()
+        connection.autocommit = True  # The commit rides on the executemany() round trip
+        statuses = execute_signup_block(cursor, rows)
 
-        if member:
-            member_id = member[0]
-            signup_date = datetime.now()
+        results = [None] * len(pairs)
+        for index, status in zip(order, statuses):
+            results[index] = SIGNUP_STATUS_MESSAGES.get(status, status)
+    finally:
+        connection.autocommit = False  # Pooled connections are reused, so restore the default
+        cursor.close()
 
-            cursor.execute("SELECT MAX(signupid) FROM SignUp")
-            max_signupid = cursor.fetchone()[0]
-            if max_signupid is None:
-                max_signupid = 0
+    get_browse_cache().invalidate()
+    return results
 
-            cursor.execute("SELECT signups_seq.NEXTVAL FROM dual")
-            current_seq_value = cursor.fetchone()[0]
+# Multi-activity sign-up: one member lookup and one executemany() of SIGNUP_PLSQL that also commits.
+# Returns (message, results) where results has one {'Activity ID', 'Result'} entry per requested activity.
+@instrumented("signup_for_activities")
+def signup_for_activities(member_name, email, activity_ids):
+    if not is_valid_email(email):
+        return "Invalid email format.", []
+
+    results = {}
+    requested = []
+    for activity_id in activity_ids:
+        try:
+            activity_id = int(str(activity_id).strip())
+        except ValueError:
+            results[activity_id] = "Invalid activity ID."
+            continue
+        if activity_id in results or activity_id in requested:
+            continue
+        requested.append(activity_id)
+
+    if not requested:
+        return "No valid activities selected.", [{'Activity ID': id, 'Result': result} for id, result in results.items()]
 
-            if current_seq_value <= max_signupid:
-                new_value = max_signupid + 1
-                cursor.execute(f"ALTER SEQUENCE signups_seq RESTART START WITH {new_value}")
-                connection.commit()
+    connection = get_db_connection()
+    if not connection:
+        return "Database connection failed.", []
 
-            cursor.execute("""
-                INSERT INTO SignUp (signupid, memberid, activityid, signup_date)
-                VALUES (signups_seq.NEXTVAL, :member_id, :activity_id, :signup_date)
-            """, member_id=member_id, activity_id=activity_id, signup_date=signup_date)
+    try:
+        member_id = lookup_member_id(connection, email)
+        if member_id is None:
+            return "Member not found. Please sign up first.", []
 
-            connection.commit()
-            return f"{member_name} has successfully signed up for activity {activity_id}!"
-        else:
-            return "Member not found. Please sign up first."
+        statuses = apply_signups(connection, [(activity_id, member_id) for activity_id in requested])
+        results.update(zip(requested, statuses))
 
     except Exception as e:
-        return f"Failed to sign up for activity: {e}"
+        connection.rollback()
+        return f"Failed to sign up for activities: {e}", []
+
+    finally:
+        connection.close()
+
+    signed_up = sum(1 for result in results.values() if result == "Signed up.")
+    return (
+        f"{member_name} has signed up for {signed_up} of {len(results)} activities.",
+        [{'Activity ID': id, 'Result': result} for id, result in results.items()],
+    )
+
+SIGNUP_WRITE_BEHIND = False  # Queue single sign-ups and apply them in micro-batches (for registration rushes)
+SIGNUP_BATCH_MAX = 200  # Most sign-ups applied in one batch
+SIGNUP_BATCH_WAIT = 0.05  # Seconds the worker waits for a batch to fill before flushing it
+SIGNUP_RESULT_TIMEOUT = 30  # Seconds a caller waits for its queued sign-up to be applied
+
+# Write-behind queue for activity sign-ups. Callers get a Future; a background worker drains the
+# queue in micro-batches and applies each batch with one member lookup, one executemany() and one commit.
+class SignupBatcher:
+    def __init__(self, max_batch=SIGNUP_BATCH_MAX, max_wait=SIGNUP_BATCH_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="signup-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, email, activity_id):
+        future = Future()
+        self._queue.put((email, activity_id, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._apply(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    @instrumented("signup_batch")
+    def _apply(self, batch):
+        connection = get_db_connection()
+        if not connection:
+            for _, _, future in batch:
+                future.set_result("Database connection failed.")
+            return
+
+        try:
+            member_ids = find_member_ids(connection, sorted({email for email, _, _ in batch}))
+            pending = []
+            for email, activity_id, future in batch:
+                if normalize_email(email) in member_ids:
+                    pending.append(((activity_id, member_ids[normalize_email(email)]), future))
+                else:
+                    future.set_result("Member not found. Please sign up first.")
+
+            if pending:
+                statuses = apply_signups(connection, [pair for pair, _ in pending])
+                for (_, future), status in zip(pending, statuses):
+                    future.set_result(status)
+
+        except Exception:
+            connection.rollback()
+            raise
+
+        finally:
+            connection.close()
+
+@st.cache_resource
+def get_signup_batcher():
+    return SignupBatcher()
+
+# Activity Sign-up Function with Validation
+@instrumented("signup_for_activity")
+def signup_for_activity(member_name, email, activity_id):
+    if SIGNUP_WRITE_BEHIND:
+        if not is_valid_email(email):
+            return "Invalid email format."
+        try:
+            activity_id = int(str(activity_id).strip())
+        except ValueError:
+            return "Invalid activity ID."
+        try:
+            result = get_signup_batcher().submit(email, activity_id).result(timeout=SIGNUP_RESULT_TIMEOUT)
+        except Exception as e:
+            return f"Failed to sign up for activity: {e}"
+        results = [{'Activity ID': activity_id, 'Result': result}]
+        message = result
+    else:
+        message, results = signup_for_activities(member_name, email, [activity_id])
+    if len(results) != 1:
+        return message
+    if results[0]['Result'] == "Signed up.":
+        return f"{member_name} has successfully signed up for activity {activity_id}!"
+    return f"Failed to sign up for activity {activity_id}: {results[0]['Result']}"
+
+SEAT_COUNT_RECONCILE_INTERVAL = 3600  # Seconds between background checks of ActivitySignupCount against SignUp
+
+# Bring ActivitySignupCount in line with SignUp: adds missing activities, corrects drifted counts
+# and drops rows for activities that no longer exist
+SEAT_COUNT_RECONCILE_STATEMENTS = [
+    """
+    MERGE INTO ActivitySignupCount c
+    USING (
+        SELECT a.activityid, COUNT(s.signupid) AS taken
+        FROM Activity a
+        LEFT JOIN SignUp s ON s.activityid = a.activityid
+        GROUP BY a.activityid
+    ) t
+    ON (c.activityid = t.activityid)
+    WHEN MATCHED THEN UPDATE SET c.taken = t.taken WHERE c.taken <> t.taken
+    WHEN NOT MATCHED THEN INSERT (activityid, taken) VALUES (t.activityid, t.taken)
+    """,
+    "DELETE FROM ActivitySignupCount WHERE activityid NOT IN (SELECT activityid FROM Activity)",
+]
+
+# Full recount of the seat summary (startup backfill, background job and admin "on demand" button).
+# `report` is passed on to get_db_connection().
+@instrumented("reconcile_seat_counts")
+def reconcile_seat_counts(report=None):
+    connection = get_db_connection(report)
+    if not connection:
+        return "Database connection failed."
 
+    cursor = connection.cursor()
+    try:
+        corrected = 0
+        for statement in SEAT_COUNT_RECONCILE_STATEMENTS:
+            cursor.execute(statement)
+            corrected += cursor.rowcount
+        connection.commit()
+        if corrected:
+            get_browse_cache().invalidate()
+        return f"Seat counts reconciled ({corrected} rows corrected)."
+    except Exception as e:
+        connection.rollback()
+        return f"Failed to reconcile seat counts: {e}"
     finally:
         cursor.close()
         connection.close()
 
-# Function to browse all activities and display in a table
-def browse_activities():
+# Schema objects the app cannot run without, each with the function that backfills it when it is new
+# (None if it needs none). Unlike SCHEMA_UPGRADES these are applied automatically on the first run in
+# every process.
+REQUIRED_SCHEMA = [
+    # Running sign-up count per activity, kept current by SIGNUP_PLSQL and the write paths
+    ("CREATE TABLE ActivitySignupCount (activityid NUMBER PRIMARY KEY, taken NUMBER DEFAULT 0 NOT NULL) ORGANIZATION INDEX",
+     reconcile_seat_counts),
+    # Case-insensitive email uniqueness (signup_new_member relies on its ORA-00001); also serves every
+    # LOWER(email) = :email member lookup. Fails with ORA-01452 while duplicate emails exist.
+    ("CREATE UNIQUE INDEX member_email_lower_ux ON Member (LOWER(email))", None),
+    # Archive tables used by purge_activities(): same columns as the live tables plus archived_at
+    ("CREATE TABLE ActivityArchive AS SELECT a.*, SYSDATE AS archived_at FROM Activity a WHERE 1 = 0", None),
+    ("CREATE TABLE InstructorActivityArchive AS SELECT ia.*, SYSDATE AS archived_at FROM InstructorActivity ia WHERE 1 = 0", None),
+    ("CREATE TABLE SignUpArchive AS SELECT s.*, SYSDATE AS archived_at FROM SignUp s WHERE 1 = 0", None),
+]
+
+# Creates missing REQUIRED_SCHEMA objects and backfills them; retried on later runs until it succeeds
+class RequiredSchema:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backfills = []  # Backfills for objects created here that have not completed yet
+        self.ready = False
+
+    # Returns None once the schema is in place, otherwise an error message
+    @instrumented("required_schema")
+    def ensure(self):
+        with self._lock:
+            if self.ready:
+                return None
+
+            connection = get_db_connection()
+            if not connection:
+                return "Database connection failed."
+
+            cursor = connection.cursor()
+            try:
+                for statement, backfill in REQUIRED_SCHEMA:
+                    try:
+                        cursor.execute(statement)
+                        if backfill:
+                            self._backfills.append(backfill)
+                    except oracledb.DatabaseError as e:
+                        error, = e.args
+                        if error.code not in ALREADY_EXISTS_ERRORS:
+                            return f"Failed to create required schema: {statement} ({error.message})"
+            finally:
+                cursor.close()
+                connection.close()
+
+            while self._backfills:
+                result = self._backfills[0]()
+                if result.startswith("Failed") or result.startswith("Database"):
+                    return result
+                self._backfills.pop(0)
+            self.ready = True
+            return None
+
+@st.cache_resource
+def get_required_schema():
+    return RequiredSchema()
+
+# Runs reconcile_seat_counts() on a daemon thread every SEAT_COUNT_RECONCILE_INTERVAL seconds.
+# Started once RequiredSchema.ensure() has done the startup backfill, so the first recount waits an interval.
+# The thread has no script context, so problems go to the log rather than st.error.
+class SeatCountReconciler:
+    def __init__(self, interval=SEAT_COUNT_RECONCILE_INTERVAL):
+        self.interval = interval
+        self.last_result = None
+        self._worker = threading.Thread(target=self._run, name="seat-count-reconciler", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.last_result = reconcile_seat_counts(report=logger.warning)
+            if self.last_result.startswith("Failed"):  # Connection failures were already reported
+                logger.warning(self.last_result)
+
+@st.cache_resource
+def get_seat_count_reconciler():
+    return SeatCountReconciler()
+
+BROWSE_PAGE_SIZE = 50  # Activities per page on "Browse Activities"
+BROWSE_DEFAULT_WINDOW_DAYS = 90  # Default date window: today .. today + N days
+
+# Function to browse one page of activities, filtered and paginated in SQL.
+# `after` is the keyset cursor (activity_date, activityid) of the last row on the previous page;
+# returns (activities_df, next_cursor), where next_cursor is None on the last page.
+@instrumented("browse_activities")
+def browse_activities(start_date=None, end_date=None, location=None, instructor_id=None, max_price=None,
+                      after=None, page_size=BROWSE_PAGE_SIZE):
+    if start_date is None:
+        start_date = date.today()  # Upcoming activities only unless asked otherwise
+
+    cache = get_browse_cache()
+    cache_key = (start_date, end_date, location, instructor_id, max_price, after, page_size)
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = stale_fallback(cache, cache_key)
+    if cached is not None:
+        return cached
+
+    conditions = ["a.activity_date >= :start_date"]
+    params = {"start_date": start_date, "page_size": page_size + 1}  # One extra row tells us if there is a next page
+    if end_date is not None:
+        conditions.append("a.activity_date <= :end_date")
+        params["end_date"] = end_date
+    if location:
+        conditions.append("a.location = :location")
+        params["location"] = location
+    if instructor_id is not None:
+        conditions.append("EXISTS (SELECT 1 FROM InstructorActivity ia WHERE ia.activityid = a.activityid"
+                          " AND ia.instructorid = :instructor_id)")
+        params["instructor_id"] = instructor_id
+    if max_price is not None:
+        conditions.append("a.price <= :max_price")
+        params["max_price"] = max_price
+    if after is not None:
+        conditions.append("(a.activity_date > :after_date OR (a.activity_date = :after_date AND a.activityid > :after_id))")
+        params["after_date"], params["after_id"] = after
+
     connection = get_db_connection()
     if connection is None:
         st.error("Failed to connect to the database.")
-        return None
+        return None, None
 
     try:
-        cursor = connection.cursor()
-
-        query = """
-        SELECT a.activityid, a.activityname, a.activity_date, a.start_time, a.end_time, a.capacity, a.location, a.price,
-               i.first_name || ' ' || i.last_name AS instructor
+        # Instructors are folded into one column per activity, so each activity is exactly one row
+        # and the (activity_date, activityid) keyset never splits or repeats an activity across pages
+        query = f"""
+        SELECT a.activityid, a.activityname, a.activity_date, a.start_time, a.end_time, a.capacity,
+               GREATEST(a.capacity - NVL(c.taken, 0), 0) AS seats_left, a.location, a.price,
+               (SELECT LISTAGG(i.first_name || ' ' || i.last_name, ', ') WITHIN GROUP (ORDER BY i.first_name, i.last_name)
+                FROM InstructorActivity ia JOIN Instructor i ON ia.instructorid = i.instructorid
+                WHERE ia.activityid = a.activityid) AS instructor
         FROM Activity a
-        LEFT JOIN InstructorActivity ia ON a.activityid = ia.activityid
-        LEFT JOIN Instructor i ON ia.instructorid = i.instructorid
-        ORDER BY a.activity_date
+        LEFT JOIN ActivitySignupCount c ON c.activityid = a.activityid
+        WHERE {" AND ".join(conditions)}
+        ORDER BY a.activity_date, a.activityid
+        FETCH FIRST :page_size ROWS ONLY
         """
-        cursor.execute(query)
-        activities = cursor.fetchall()
+        columns = ['Activity ID','Activity Name', 'Date', 'Start Time', 'End Time', 'Capacity', 'Seats Left', 'Location', 'Price', 'Instructor']
+        activities_df = fetch_dataframe(connection, query, params, columns=columns)
 
-        if not activities:
-            st.warning("No activities found.")
-            return None
+        if activities_df.empty:
+            return None, None
 
-        processed_activities = []
-        for activity in activities:
-            activityid, activity_name, activity_date, start_time, end_time, capacity, location, price, instructor = activity
-            activity_date_str = activity_date.strftime("%Y-%m-%d")
-            start_time_str = start_time.strftime("%H:%M")
-            end_time_str = end_time.strftime("%H:%M")
-            processed_activities.append((activityid, activity_name, activity_date_str, start_time_str, end_time_str, capacity, location, price, instructor))
+        next_cursor = None
+        if len(activities_df) > page_size:
+            activities_df = activities_df.iloc[:page_size].copy()
+            last = activities_df.iloc[-1]
+            next_cursor = (pd.Timestamp(last['Date']).to_pydatetime(), int(last['Activity ID']))
 
-        columns = ['Activity ID','Activity Name', 'Date', 'Start Time', 'End Time', 'Capacity', 'Location', 'Price', 'Instructor']
-        activities_df = pd.DataFrame(processed_activities, columns=columns)
-
-        cursor.close()
-        connection.close()
+        activities_df['Date'] = format_datetime_column(activities_df['Date'], "%Y-%m-%d")
+        activities_df['Start Time'] = format_datetime_column(activities_df['Start Time'], "%H:%M")
+        activities_df['End Time'] = format_datetime_column(activities_df['End Time'], "%H:%M")
+        cache.put(cache_key, (activities_df, next_cursor))
 
-        return activities_df
+        return activities_df, next_cursor
 
     except Exception as e:
         st.error(f"Error fetching activities: {str(e)}")
-        return None
+        return None, None
+
+    finally:
+        # Always hand the connection back, otherwise the pool slowly runs dry
+        connection.close()
+
+REPORT_MAX_ROWS = 10000  # Cap on signup rows held in memory for one report
+REPORT_PAGE_SIZE = 100  # Rows shown per page of the report table
+
+# Stream the signup report as DataFrame chunks of up to `chunk_size` rows (fetchmany under the hood)
+def iter_signup_report(start_date=None, end_date=None, activity_id=None, max_rows=REPORT_MAX_ROWS,
+                       chunk_size=FETCH_BATCH_SIZE):
+    conditions = []
+    params = {"max_rows": max_rows}
+    if start_date is not None:
+        conditions.append("s.signup_date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        conditions.append("s.signup_date < :end_date")
+        params["end_date"] = end_date + timedelta(days=1)  # Inclusive of the whole end day
+    if activity_id is not None:
+        conditions.append("s.activityid = :activity_id")
+        params["activity_id"] = activity_id
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
-# Admin Report Function
-def generate_signup_report():
     connection = get_db_connection()
+    if not connection:
+        return
+
     cursor = connection.cursor()
+    try:
+        cursor.arraysize = chunk_size
+        cursor.execute(f"""
+            SELECT m.first_name || ' ' || m.last_name, a.activityname, s.signup_date
+            FROM SignUp s
+            JOIN Member m ON s.memberid = m.memberid
+            JOIN Activity a ON s.activityid = a.activityid
+            {where_clause}
+            ORDER BY s.signup_date DESC
+            FETCH FIRST :max_rows ROWS ONLY
+        """, params)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=['Member', 'Activity', 'Signup Date'])
 
-    cursor.execute("""
-        SELECT m.first_name || ' ' || m.last_name, a.activityname, s.signup_date
-        FROM SignUp s
-        JOIN Member m ON s.memberid = m.memberid
-        JOIN Activity a ON s.activityid = a.activityid
-        ORDER BY s.signup_date DESC
-    """)
+    finally:
+        cursor.close()
+        connection.close()
 
-    report_data = cursor.fetchall()
-    cursor.close()
-    connection.close()
+# Admin Report Function: returns (report_df, truncated), holding at most `max_rows` rows
+@instrumented("generate_signup_report")
+def generate_signup_report(start_date=None, end_date=None, activity_id=None, max_rows=REPORT_MAX_ROWS):
+    # Ask for one row more than the cap so we can tell the admin the report was cut short
+    chunks = list(iter_signup_report(start_date, end_date, activity_id, max_rows=max_rows + 1))
+    if not chunks:
+        return None, False
+
+    report_df = pd.concat(chunks, ignore_index=True)
+    truncated = len(report_df) > max_rows
+    return report_df.iloc[:max_rows], truncated
+
+ANALYTICS_CACHE_TTL = 300  # Seconds an aggregated analytics result is reused for the same parameters
+ANALYTICS_TREND_DEFAULT_DAYS = 90  # Default sign-up window for the trend view
+
+# Grouping choices for fill-rate analytics: (SQL key expressions, column labels).
+# The first expression identifies the group and is the one passed to GROUPING().
+ANALYTICS_GROUPINGS = {
+    "Activity": (["a.activityid", "a.activityname", "a.activity_date"], ["Activity ID", "Activity", "Date"]),
+    "Instructor": (["i.instructorid", "i.first_name || ' ' || i.last_name"], ["Instructor ID", "Instructor"]),
+    "Location": (["a.location"], ["Location"]),
+}
+# Trend buckets: Oracle TRUNC() format and the matching pandas frequency
+ANALYTICS_BUCKETS = {"Day": ("DD", "D"), "Week": ("IW", "W-MON"), "Month": ("MM", "MS")}
+# Optional series for the trend view, split in SQL and pivoted into columns
+ANALYTICS_SPLITS = {
+    "Location": "a.location",
+    "Instructor": "i.first_name || ' ' || i.last_name",
+}
+INSTRUCTOR_JOIN = """
+    LEFT JOIN InstructorActivity ia ON ia.activityid = a.activityid
+    LEFT JOIN Instructor i ON i.instructorid = ia.instructorid
+"""
+
+@st.cache_resource
+def get_analytics_cache():
+    return ResultCache(ANALYTICS_CACHE_TTL)
+
+# Fill-rate query: sign-ups against capacity per activity, instructor or location, with a ROLLUP total row.
+# Counts come from ActivitySignupCount, so the cost follows the number of activities, not sign-ups.
+# `start_date`/`end_date` select activities by their scheduled date. Returns (query, params).
+def fill_rates_query(group_by, start_date, end_date):
+    keys, labels = ANALYTICS_GROUPINGS[group_by]
+    conditions = []
+    params = {}
+    if start_date is not None:
+        conditions.append("a.activity_date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        conditions.append("a.activity_date < :end_date")
+        params["end_date"] = end_date + timedelta(days=1)  # Inclusive of the whole end day
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if group_by != "Instructor":
+        return f"""
+            SELECT {", ".join(keys)}, GROUPING({keys[0]}),
+                   COUNT(DISTINCT a.activityid), SUM(NVL(c.taken, 0)), SUM(a.capacity)
+            FROM Activity a
+            LEFT JOIN ActivitySignupCount c ON c.activityid = a.activityid
+            {where_clause}
+            GROUP BY ROLLUP (({", ".join(keys)}))
+        """, params
+
+    # An activity with several instructors counts toward each of them, so a ROLLUP over the instructor
+    # join would count it several times in the total. The total row is aggregated from Activity alone.
+    return f"""
+        SELECT {", ".join(keys)}, 0, COUNT(DISTINCT a.activityid), SUM(NVL(c.taken, 0)), SUM(a.capacity)
+        FROM Activity a
+        LEFT JOIN ActivitySignupCount c ON c.activityid = a.activityid
+        {INSTRUCTOR_JOIN}
+        {where_clause}
+        GROUP BY {", ".join(keys)}
+        UNION ALL
+        SELECT {", ".join("NULL" for _ in keys)}, 1, COUNT(*), SUM(NVL(c.taken, 0)), SUM(a.capacity)
+        FROM Activity a
+        LEFT JOIN ActivitySignupCount c ON c.activityid = a.activityid
+        {where_clause}
+    """, params
+
+# Fill-rate table from the query rows: labels the total row, adds Fill Rate (%) and Seats Left
+def fill_rates_frame(rows, group_by, start_date, end_date):
+    labels = ANALYTICS_GROUPINGS[group_by][1]
+    df = pd.DataFrame(rows, columns=labels + ["Total", "Activities", "Signups", "Capacity"])
+    is_total = df["Total"].astype(bool)
+    df.loc[is_total, labels[1 if len(labels) > 1 else 0]] = "All"
+    if labels[0].endswith(" ID"):
+        df[labels[0]] = df[labels[0]].astype("Int64")
+    df["Fill Rate (%)"] = (100 * df["Signups"] / df["Capacity"].where(df["Capacity"] > 0)).round(1)
+    df["Seats Left"] = (df["Capacity"] - df["Signups"]).clip(lower=0)
+    if "Date" in df:
+        df["Date"] = format_datetime_column(df["Date"], "%Y-%m-%d").where(~is_total, "")
+    return (df.assign(_total=is_total)
+              .sort_values(["_total", "Fill Rate (%)"], ascending=[True, False], na_position="last")
+              .drop(columns=["_total", "Total"])
+              .reset_index(drop=True))
+
+# Trend query: sign-ups per day/week/month, optionally split per location or instructor.
+# Rows are (period, series, is_total, count); split per instructor, a sign-up for a class with several
+# instructors is in each of their series, so the per-period totals are counted separately.
+# `start_date`/`end_date` select sign-ups by signup_date. Returns (query, params).
+def trend_query(bucket, split_by, start_date, end_date):
+    period = f"TRUNC(s.signup_date, '{ANALYTICS_BUCKETS[bucket][0]}')"
+    series = ANALYTICS_SPLITS[split_by] if split_by else "'Signups'"
+    conditions = ["s.signup_date >= :start_date"]
+    params = {"start_date": start_date}
+    if end_date is not None:
+        conditions.append("s.signup_date < :end_date")
+        params["end_date"] = end_date + timedelta(days=1)  # Inclusive of the whole end day
+
+    where_clause = f"WHERE {' AND '.join(conditions)}"
+
+    query = f"""
+        SELECT {period}, {series}, 0, COUNT(*)
+        FROM SignUp s
+        JOIN Activity a ON a.activityid = s.activityid
+        {INSTRUCTOR_JOIN if split_by == "Instructor" else ""}
+        {where_clause}
+        GROUP BY {period}, {series}
+    """
+    if split_by == "Instructor":
+        query += f"""
+        UNION ALL
+        SELECT {period}, NULL, 1, COUNT(*)
+        FROM SignUp s
+        {where_clause}
+        GROUP BY {period}
+        """
+    return query, params
+
+# Trend table from the aggregate rows: pandas only pivots them and fills empty periods with 0
+def trend_frame(rows, bucket, split_by, start_date, end_date):
+    df = pd.DataFrame(rows, columns=["Period", "Series", "Is Total", "Signups"])
+    df["Period"] = pd.to_datetime(df["Period"])
+    df["Series"] = df["Series"].fillna("Unassigned")
+    is_total = df["Is Total"].astype(bool)
+    trend = df[~is_total].pivot_table(index="Period", columns="Series", values="Signups", aggfunc="sum", fill_value=0)
+    periods = pd.date_range(df["Period"].min(), df["Period"].max(), freq=ANALYTICS_BUCKETS[bucket][1])
+    trend = trend.reindex(periods, fill_value=0)
+    trend.index.name = "Period"
+    trend.columns.name = None
+    if is_total.any():
+        trend["Total"] = df[is_total].groupby("Period")["Signups"].sum().reindex(periods, fill_value=0)
+    elif split_by:
+        trend["Total"] = trend.sum(axis=1)
+    return trend
+
+# View name -> (query builder, frame builder); both take the view's arguments
+ANALYTICS_VIEWS = {"fill_rates": (fill_rates_query, fill_rates_frame), "trend": (trend_query, trend_frame)}
+
+# Analytics views by name, e.g. {"fill_rates": ("Activity", None, None), "trend": ("Week", None, start, end)}.
+# Cached views are reused; the aggregate queries for the rest run concurrently.
+# Returns {name: DataFrame or None}; None also stands for "no rows".
+@instrumented("analytics")
+def load_analytics(views):
+    cache = get_analytics_cache()
+    results = {}
+    for name, args in views.items():
+        cached = cache.get((name,) + args)
+        if cached is None:
+            cached = stale_fallback(cache, (name,) + args)
+        results[name] = cached
+    missing = [name for name, result in results.items() if result is None]
+    if not missing:
+        return results
 
-    return report_data
+    try:
+        rows = fetch_concurrently({name: ANALYTICS_VIEWS[name][0](*views[name]) for name in missing})
+    except Exception as e:
+        st.error(f"Error computing analytics: {e}")
+        return results
+
+    with timed_phase("dataframe"):
+        for name in missing:
+            if rows[name]:
+                results[name] = ANALYTICS_VIEWS[name][1](rows[name], *views[name])
+                cache.put((name,) + views[name], results[name])
+    return results
+
+# Fill rates per activity, instructor or location (see fill_rates_query). Returns a DataFrame or None.
+@instrumented("signup_fill_rates")
+def signup_fill_rates(group_by="Activity", start_date=None, end_date=None):
+    return load_analytics({"fill_rates": (group_by, start_date, end_date)})["fill_rates"]
+
+# Sign-up counts per period (see trend_query). Returns a DataFrame indexed by period, or None.
+@instrumented("signup_trend")
+def signup_trend(bucket="Week", split_by=None, start_date=None, end_date=None):
+    if start_date is None:
+        start_date = date.today() - timedelta(days=ANALYTICS_TREND_DEFAULT_DAYS)
+    return load_analytics({"trend": (bucket, split_by, start_date, end_date)})["trend"]
+
+QUERY_PREVIEW_ROWS = 200  # Rows of an ad-hoc query shown on screen
+CUSTOM_QUERY_TIMEOUT = 30  # Seconds any single database call of an ad-hoc query may take
+CUSTOM_QUERY_MAX_ROWS = 200000  # Rows an ad-hoc export may fetch before it is cut off
+EXPLAIN_FULL_SCAN_ROWS = 100000  # Warn about full scans of tables with more rows than this
+QUERY_CACHE_TTL = 300  # Seconds an ad-hoc query result is served from memory
+QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory budget for cached ad-hoc results and their exports
+EXPORT_BATCH_SIZE = 5000  # Rows per fetchmany() while exporting
+EXPORT_SPOOL_BYTES = 16 * 1024 * 1024  # Export size kept in memory before the temp file spills to disk
+EXCEL_MAX_ROWS = 1048575  # Worksheet row limit, minus the header row
+EXPORT_FORMATS = {
+    "csv": ("query_result.csv", "text/csv"),
+    "xlsx": ("query_result.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Normalize SQL text for use as a cache key: drop a trailing semicolon, collapse whitespace
+# and fold case, leaving quoted literals and identifiers untouched
+SQL_QUOTED = re.compile(r"""('(?:[^']|'')*'|"[^"]*")""")
+
+def normalize_sql(query):
+    parts = SQL_QUOTED.split(query.strip().rstrip(";").strip())
+    return "".join(part if index % 2 else re.sub(r"\s+", " ", part).lower() for index, part in enumerate(parts))
+
+# LRU cache of ad-hoc query results, bounded by an estimate of their memory use.
+# Each entry holds the preview DataFrame and, once somebody asks for one, the rendered export bytes.
+class QueryResultCache:
+    def __init__(self, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> entry dict, least recently used first
+        self._bytes = 0
+
+    @staticmethod
+    def _size(entry):
+        size = entry["preview"].memory_usage(index=True, deep=True).sum() if entry["preview"] is not None else 0
+        size *= 2  # The raw rows kept for exports take about as much again
+        return int(size) + sum(len(data) for data, _, _ in entry["exports"].values())
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry["stored_at"] >= self.ttl:
+            self._drop(key)
+            entry = None
+        return entry
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)["size"]
+
+    def _store(self, key, entry):
+        entry["size"] = self._size(entry)
+        if key in self._entries:
+            self._drop(key)
+        if entry["size"] > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry["size"]
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    # Returns (preview_df, truncated, stored_at) or None
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry["preview"], entry["truncated"], entry["stored_at_wall"]
+
+    def put(self, key, preview, truncated, rows=None):
+        with self._lock:
+            self._store(key, {
+                "preview": preview,
+                "truncated": truncated,
+                "rows": rows,
+                "exports": {},
+                "stored_at": time.monotonic(),
+                "stored_at_wall": datetime.now(),
+            })
+
+    # Returns (columns, rows) of a cached result that was fetched in full, or None
+    def get_rows(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None or entry["preview"] is None or entry["truncated"] or entry["rows"] is None:
+                return None
+            return list(entry["preview"].columns), entry["rows"]
+
+    # Returns (bytes, rows_written, truncated) for a previously rendered export, or None
+    def get_export(self, key, fmt):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None or fmt not in entry["exports"]:
+                return None
+            self._entries.move_to_end(key)
+            return entry["exports"][fmt]
+
+    # Exports are only kept alongside a live preview entry, so they expire with it
+    def put_export(self, key, fmt, data, rows_written, truncated):
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None:
+                entry["exports"][fmt] = (data, rows_written, truncated)
+                self._store(key, entry)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+@st.cache_resource
+def get_query_cache():
+    return QueryResultCache(QUERY_CACHE_TTL, QUERY_CACHE_MAX_BYTES)
+
+# Connections currently running an ad-hoc query, keyed by the admin's session,
+# so a Cancel click (which arrives on a new script run) can interrupt the statement
+class RunningQueries:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    @contextlib.contextmanager
+    def track(self, key, connection):
+        if key is None:
+            yield
+            return
+        with self._lock:
+            self._connections[key] = connection
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._connections.pop(key, None)
+
+    def cancel(self, key):
+        with self._lock:
+            connection = self._connections.get(key)
+        if connection is None:
+            return False
+        connection.cancel()  # Breaks the running call; it fails with ORA-01013
+        return True
+
+@st.cache_resource
+def get_running_queries():
+    return RunningQueries()
+
+# Interrupt whatever ad-hoc query the given session is running
+def cancel_custom_query(cancel_key):
+    return get_running_queries().cancel(cancel_key)
+
+# Apply the per-call time limit for the duration of an ad-hoc query
+@contextlib.contextmanager
+def query_guardrails(connection, cancel_key):
+    connection.call_timeout = CUSTOM_QUERY_TIMEOUT * 1000
+    try:
+        with get_running_queries().track(cancel_key, connection):
+            yield
+    finally:
+        connection.call_timeout = 0  # Pooled connections are reused, so restore the default
+
+# Admin SQL Query Function: returns (preview_df, truncated, cached_at) with at most `max_rows` rows.
+# Results are cached per normalized SQL text for QUERY_CACHE_TTL; cached_at is None for a fresh run
+# and `refresh=True` skips the cache. Database errors are raised to the caller; `cancel_key` lets
+# cancel_custom_query() interrupt it.
+@instrumented("execute_custom_query")
+def execute_custom_query(query, max_rows=QUERY_PREVIEW_ROWS, cancel_key=None, refresh=False):
+    cache = get_query_cache()
+    cache_key = (normalize_sql(query), max_rows)
+    if not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-# Admin SQL Query Function
-def execute_custom_query(query):
     connection = get_db_connection()
+    if not connection:
+        return None, False, None
+
     cursor = connection.cursor()
 
     try:
-        cursor.execute(query)
-        data = cursor.fetchall()
-        if not data:
-            return None
-
-        columns = [col[0] for col in cursor.description]
-        query_data = pd.DataFrame(data, columns=columns)
-
-    except Exception as e:
-        query_data = None
-        st.error(f"An error occurred while executing the query: {e}")
+        with query_guardrails(connection, cancel_key):
+            cursor.arraysize = max_rows + 1
+            cursor.prefetchrows = max_rows + 2  # Preview arrives with the execute round trip
+            cursor.execute(query)
+            data = cursor.fetchmany(max_rows + 1)
+
+        if data:
+            columns = [col[0] for col in cursor.description]
+            preview, truncated = pd.DataFrame(data[:max_rows], columns=columns), len(data) > max_rows
+        else:
+            preview, truncated = None, False
+        cache.put(cache_key, preview, truncated, data[:max_rows] if not truncated else None)
+        return preview, truncated, None
 
     finally:
         cursor.close()
         connection.close()
 
-    return query_data
-
-# Function to fetch instructors
-def fetch_instructors():
+# EXPLAIN PLAN for an ad-hoc query, without running it.
+# Returns (plan_df, warnings) where warnings flag full scans of tables above EXPLAIN_FULL_SCAN_ROWS.
+@instrumented("explain_custom_query")
+def explain_custom_query(query):
     connection = get_db_connection()
     if not connection:
-        return []
+        return None, ["Database connection failed."]
 
+    statement_id = f"club_{uuid.uuid4().hex[:20]}"
     cursor = connection.cursor()
 
     try:
-        cursor.execute("SELECT instructorid, first_name || ' ' || last_name FROM Instructor ORDER BY first_name")
-        instructors = cursor.fetchall()
-        return instructors
+        cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {query}")
+        cursor.execute("""
+            SELECT p.id, LPAD(' ', 2 * p.depth) || p.operation || NVL2(p.options, ' ' || p.options, NULL),
+                   p.object_name, p.cardinality, p.cost, t.num_rows
+            FROM plan_table p
+            LEFT JOIN all_tables t ON t.owner = p.object_owner AND t.table_name = p.object_name
+            WHERE p.statement_id = :statement_id
+            ORDER BY p.id
+        """, statement_id=statement_id)
+        plan_df = pd.DataFrame(cursor.fetchall(), columns=['Step', 'Operation', 'Object', 'Est. Rows', 'Cost', 'Table Rows'])
+        cursor.execute("DELETE FROM plan_table WHERE statement_id = :statement_id", statement_id=statement_id)
+        connection.commit()
 
-    except Exception as e:
-        st.error("Failed to fetch instructors.")
-        return []
+        warnings = []
+        for _, step in plan_df.iterrows():
+            table_rows = step['Table Rows'] if pd.notna(step['Table Rows']) else step['Est. Rows']
+            if "TABLE ACCESS FULL" in step['Operation'] and pd.notna(table_rows) and table_rows > EXPLAIN_FULL_SCAN_ROWS:
+                warnings.append(f"Full scan of {step['Object']} (~{int(table_rows):,} rows). Add a filter on an indexed column if you can.")
+            if "CARTESIAN" in step['Operation']:
+                warnings.append("The plan contains a Cartesian join; check that every table is joined.")
+        return plan_df, warnings
 
     finally:
         cursor.close()
         connection.close()
 
+# Write `columns` and then each batch of rows from `batches` to `spool` as CSV or xlsx, stopping after
+# `row_limit` rows. `progress(rows_written)` is called after every batch. Returns (rows_written, truncated).
+def write_export(spool, fmt, columns, batches, row_limit, progress=None):
+    rows_written = 0
+    truncated = False
+
+    if fmt == "csv":
+        text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(columns)
+        write_rows = writer.writerows
+    else:
+        import xlsxwriter  # Only needed when someone actually asks for Excel
+
+        # constant_memory flushes each row to disk once the next one starts
+        workbook = xlsxwriter.Workbook(spool, {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"})
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, columns)
+
+        def write_rows(rows):
+            for offset, row in enumerate(rows, start=rows_written + 1):
+                worksheet.write_row(offset, 0, row)
+
+    for rows in batches:
+        if rows_written + len(rows) > row_limit:
+            rows = rows[:row_limit - rows_written]
+            truncated = True
+        with timed_phase("render"):
+            write_rows(rows)
+        rows_written += len(rows)
+        if progress:
+            progress(rows_written)
+        if truncated:
+            break
+
+    with timed_phase("render"):
+        if fmt == "csv":
+            text.flush()
+            text.detach()  # Leave the underlying spool file open for the download
+        else:
+            workbook.close()
+    return rows_written, truncated
+
+# Stream an ad-hoc query into a spooled temp file as CSV or xlsx, one fetchmany() batch at a time.
+# Stops after `max_rows` rows (or the worksheet limit for xlsx); `progress(rows_written)` is called after
+# every batch. Returns (file, rows_written, truncated). Rendered exports are kept in the query cache;
+# when the cached preview already holds the whole result the export is built from it without a query.
+@instrumented("export_custom_query")
+def export_custom_query(query, fmt, progress=None, max_rows=CUSTOM_QUERY_MAX_ROWS, cancel_key=None, refresh=False):
+    cache = get_query_cache()
+    cache_key = (normalize_sql(query), QUERY_PREVIEW_ROWS)
+    row_limit = min(max_rows, EXCEL_MAX_ROWS) if fmt == "xlsx" else max_rows
+
+    cached_rows = None
+    if not refresh:
+        cached_export = cache.get_export(cache_key, fmt)
+        if cached_export is not None:
+            data, rows_written, truncated = cached_export
+            return io.BytesIO(data), rows_written, truncated
+        cached_rows = cache.get_rows(cache_key)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    try:
+        if cached_rows is not None:
+            columns, rows = cached_rows
+            rows_written, truncated = write_export(spool, fmt, columns, [rows], row_limit, progress)
+        else:
+            connection = get_db_connection()
+            if not connection:
+                spool.close()
+                return None, 0, False
+            cursor = connection.cursor()
+            try:
+                with query_guardrails(connection, cancel_key):
+                    cursor.arraysize = EXPORT_BATCH_SIZE
+                    cursor.execute(query)
+                    columns = [col[0] for col in cursor.description]
+                    rows_written, truncated = write_export(
+                        spool, fmt, columns, iter(cursor.fetchmany, []), row_limit, progress
+                    )
+            finally:
+                cursor.close()
+                connection.close()
+    except Exception:
+        spool.close()
+        raise
+
+    size = spool.tell()
+    record_measure("bytes", size)
+    spool.seek(0)
+    if size <= cache.max_bytes // 4:  # Keep one huge export from flushing the whole cache
+        cache.put_export(cache_key, fmt, spool.read(), rows_written, truncated)
+        spool.seek(0)
+    return spool, rows_written, truncated
+
+# Deferred `data` for st.download_button: the export file is only read when Download is clicked, on a
+# server thread and possibly more than once. The file is closed when Streamlit drops the callable.
+def export_reader(export_file):
+    lock = threading.Lock()
+
+    def read():
+        with lock:
+            export_file.seek(0)
+            return export_file.read()
+
+    return read
+
+REFERENCE_PROBE_INTERVAL = 30  # Seconds between version probes of the dropdown reference data
+
+# Cheap version stamp for the reference data: row counts and max keys, answered from the primary key indexes
+REFERENCE_VERSION_SQL = """
+    SELECT (SELECT COUNT(*) || ':' || MAX(instructorid) FROM Instructor) || '/' ||
+           (SELECT COUNT(*) || ':' || MAX(activityid) FROM Activity)
+    FROM dual
+"""
+
+REFERENCE_LIST_QUERIES = {
+    "instructors": ("SELECT instructorid, first_name || ' ' || last_name FROM Instructor ORDER BY first_name", None),
+    "activities": ("SELECT activityid, activityname FROM Activity ORDER BY activityname", None),
+}
+
+# Instructor and activity ID/name lists for the admin dropdowns, shared by every tab and session.
+# The lists are reloaded only when the version probe changes or a write calls invalidate().
+class ReferenceData:
+    def __init__(self, probe_interval=REFERENCE_PROBE_INTERVAL):
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._checked_at = 0.0
+        self._loaded_at = None  # Wall-clock time of the last reload, shown when serving stale lists
+        self._stale = False
+
+    @instrumented("reference_data")
+    def get(self):
+        with self._lock:
+            if self._data is not None and not self._stale and time.monotonic() - self._checked_at < self.probe_interval:
+                return self._data
+            if self._data is not None and get_circuit_breaker().rejecting():
+                warn_stale(self._loaded_at)
+                return self._data
+
+            # When a reload is certain the probe and both lists go out together; otherwise probe first
+            reload = self._data is None or self._stale
+            queries = {"version": (REFERENCE_VERSION_SQL, None)}
+            if reload:
+                queries.update(REFERENCE_LIST_QUERIES)
+            try:
+                results = fetch_concurrently(queries)
+                version = results["version"][0][0]
+                if reload or version != self._version:
+                    if "instructors" not in results:
+                        results.update(fetch_concurrently(REFERENCE_LIST_QUERIES))
+                    self._data = {"instructors": results["instructors"], "activities": results["activities"]}
+                    self._version = version
+                    self._loaded_at = datetime.now()
+                    self._stale = False
+                self._checked_at = time.monotonic()
+
+            except Exception as e:
+                st.error(f"Failed to fetch instructors and activities: {e}")
+
+            return self._data or {"instructors": [], "activities": []}
+
+    # Force a reload on the next get(); the old lists are kept only to show while the database is down
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+@st.cache_resource
+def get_reference_data():
+    return ReferenceData()
+
+# Called after any write to activities so cached views pick it up on the next rerun
+def invalidate_activity_caches():
+    get_browse_cache().invalidate()
+    get_reference_data().invalidate()
+
+# Function to fetch instructors
+def fetch_instructors():
+    return get_reference_data().get()["instructors"]
+
+SCHEDULE_INDEX_TTL = 300  # Seconds before the in-memory schedule index is rebuilt from the database
+
+# Locations are stored and compared trimmed, so "Gym" and "Gym " are one room both here and in the database.
+# Applied once where a location enters the app: the activity functions and the activity forms.
+def normalize_location(location):
+    return location.strip() if location else location
+
+# Interval index of scheduled activities per instructor and per location.
+# Each resource keeps its slots sorted by start time, so an overlap query is a bisect for the
+# first slot starting at or after the new end, then a short walk back over the slots that could
+# still reach the new start (bounded by the longest slot seen): O(log n + conflicts).
+# A slot is (start, end, activity_id) with start/end as datetimes.
+class ScheduleIndex:
+    def __init__(self):
+        self._starts = defaultdict(list)  # resource -> sorted start datetimes
+        self._slots = defaultdict(list)  # resource -> slots, parallel to _starts
+        self._longest = defaultdict(timedelta)  # resource -> longest slot duration
+        self._resources = defaultdict(list)  # activity_id -> resources it occupies
+
+    @staticmethod
+    def resources(instructor_id, location):
+        keys = []
+        if instructor_id is not None:
+            keys.append(("instructor", instructor_id))
+        if location:
+            keys.append(("location", location))
+        return keys
+
+    def add(self, activity_id, start, end, instructor_id, location):
+        for resource in self.resources(instructor_id, location):
+            position = bisect.bisect_right(self._starts[resource], start)
+            self._starts[resource].insert(position, start)
+            self._slots[resource].insert(position, (start, end, activity_id))
+            self._longest[resource] = max(self._longest[resource], end - start)
+            self._resources[activity_id].append(resource)
+
+    def remove(self, activity_id):
+        for resource in self._resources.pop(activity_id, []):
+            slots = self._slots[resource]
+            for position, slot in enumerate(slots):
+                if slot[2] == activity_id:
+                    del slots[position]
+                    del self._starts[resource][position]
+                    break
+
+    # Slots overlapping [start, end) for the instructor or the location, as (resource, slot) pairs
+    def conflicts(self, start, end, instructor_id, location, ignore_activity_id=None):
+        found = []
+        for resource in self.resources(instructor_id, location):
+            starts = self._starts.get(resource)
+            if not starts:
+                continue
+            slots = self._slots[resource]
+            earliest = start - self._longest[resource]
+            position = bisect.bisect_left(starts, end)
+            while position > 0 and starts[position - 1] > earliest:
+                position -= 1
+                slot = slots[position]
+                if slot[1] > start and slot[2] != ignore_activity_id:
+                    found.append((resource, slot))
+        return found
+
+# Activity rows for the schedule index: (activity_id, start, end, instructor_id, location)
+def schedule_rows(rows):
+    for activity_id, activity_date, start_time, end_time, instructor_id, location in rows:
+        day = activity_date.date() if isinstance(activity_date, datetime) else activity_date
+        yield (activity_id, datetime.combine(day, start_time.time()), datetime.combine(day, end_time.time()),
+               instructor_id, location)
+
+SCHEDULE_SQL = """
+    SELECT a.activityid, a.activity_date, a.start_time, a.end_time, ia.instructorid, a.location
+    FROM Activity a
+    LEFT JOIN InstructorActivity ia ON ia.activityid = a.activityid
+"""
+
+# Process-wide ScheduleIndex, loaded on first use and rebuilt every SCHEDULE_INDEX_TTL seconds
+# (or after invalidate()) so writes from other app servers are picked up
+class ScheduleCache:
+    def __init__(self, ttl=SCHEDULE_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._loaded_at = 0.0
+
+    # Pass the caller's connection when it already holds one, so a reload never waits on a second pool slot
+    @instrumented("schedule_index")
+    def get(self, connection=None):
+        with self._lock:
+            if self._index is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._index
+
+            own_connection = connection is None
+            if own_connection and self._index is not None and get_circuit_breaker().rejecting():
+                return self._index  # Only an early warning; writes re-check in the database anyway
+            if own_connection:
+                connection = get_db_connection()
+                if not connection:
+                    return self._index or ScheduleIndex()
+
+            cursor = connection.cursor()
+            try:
+                cursor.arraysize = FETCH_BATCH_SIZE
+                cursor.execute(SCHEDULE_SQL + " WHERE a.activity_date >= TRUNC(SYSDATE) - 1")
+                index = ScheduleIndex()
+                for rows in iter(cursor.fetchmany, []):
+                    for row in schedule_rows(rows):
+                        index.add(*row)
+                self._index = index
+                self._loaded_at = time.monotonic()
+            finally:
+                cursor.close()
+                if own_connection:
+                    connection.close()
+            return self._index
+
+    # Apply a committed write to the loaded index (no-op until it has been loaded)
+    def record(self, activity_id, start=None, end=None, instructor_id=None, location=None):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(activity_id)
+                if start is not None:
+                    self._index.add(activity_id, start, end, instructor_id, location)
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+@st.cache_resource
+def get_schedule_cache():
+    return ScheduleCache()
+
+# Describe conflicts from ScheduleIndex.conflicts() for the admin
+def describe_conflicts(conflicts):
+    lines = []
+    for (kind, name), (start, end, activity_id) in conflicts:
+        who = f"Instructor (ID: {name})" if kind == "instructor" else f"Location '{name}'"
+        lines.append(f"{who} is already booked for activity {activity_id} on {start:%Y-%m-%d} {start:%H:%M}-{end:%H:%M}.")
+    return " ".join(lines)
+
+# Check candidate slots against the in-memory index and against each other.
+# `candidates` are (activity_id, start, end, instructor_id, location); activity_id may be None for new
+# activities. Returns {candidate position: conflicts}.
+def find_schedule_conflicts(candidates, index=None):
+    index = index or get_schedule_cache().get()
+    batch = ScheduleIndex()
+    found = {}
+    for position, (activity_id, start, end, instructor_id, location) in enumerate(candidates):
+        conflicts = index.conflicts(start, end, instructor_id, location, ignore_activity_id=activity_id)
+        conflicts += batch.conflicts(start, end, instructor_id, location)
+        if conflicts:
+            found[position] = conflicts
+        batch.add(activity_id if activity_id is not None else ("new", position), start, end, instructor_id, location)
+    return found
+
+# Early warning for the activity forms from the shared index; the write itself re-checks in the database
+def schedule_conflict_warning(activity_id, activity_date, start_time, end_time, instructor_id, location):
+    location = normalize_location(location)
+    if end_time <= start_time:
+        return None  # Not a slot yet (both pickers start at the current time); the write rejects it
+    slot = (activity_id, datetime.combine(activity_date, start_time), datetime.combine(activity_date, end_time), instructor_id, location)
+    conflicts = find_schedule_conflicts([slot])
+    return f"Schedule conflict: {describe_conflicts(conflicts[0])}" if conflicts else None
+
+# Authoritative conflict check inside the caller's write transaction. Locks the instructors' rows so
+# concurrent bookings for the same instructor serialize, then loads only the activities sharing an
+# instructor or location within the candidates' date range (one round trip) and checks them in memory.
+# Locations have no row to lock, so two admins booking the same room at the same moment can still race.
+def validate_schedule_in_db(connection, cursor, candidates):
+    instructor_ids = sorted({c[3] for c in candidates if c[3] is not None})
+    locations = sorted({c[4] for c in candidates if c[4]})
+    number_list = connection.gettype("SYS.ODCINUMBERLIST")
+    string_list = connection.gettype("SYS.ODCIVARCHAR2LIST")
+
+    cursor.execute(
+        "SELECT instructorid FROM Instructor WHERE instructorid IN (SELECT column_value FROM TABLE(:ids)) FOR UPDATE",
+        ids=number_list.newobject(instructor_ids),
+    )
+    cursor.execute(SCHEDULE_SQL + """
+        WHERE a.activity_date BETWEEN :first_date AND :last_date
+          AND (ia.instructorid IN (SELECT column_value FROM TABLE(:instructors))
+               OR a.location IN (SELECT column_value FROM TABLE(:locations)))
+    """, first_date=min(c[1] for c in candidates).date(), last_date=max(c[1] for c in candidates).date(),
+        instructors=number_list.newobject(instructor_ids), locations=string_list.newobject(locations))
+
+    index = ScheduleIndex()
+    for row in schedule_rows(cursor.fetchall()):
+        index.add(*row)
+    found = find_schedule_conflicts(candidates, index)
+    if found.keys() != find_schedule_conflicts(candidates, get_schedule_cache().get(connection)).keys():
+        get_schedule_cache().invalidate()  # The shared index has drifted from the database
+    return found
+
 # Function to create a new activity in the database
+@instrumented("create_activity")
 def create_activity(activity_name, activity_date, start_time, end_time, capacity, location, price, instructor_id):
+    location = normalize_location(location)  # Same value for the conflict check and the insert
     connection = get_db_connection()
     if not connection:
         return "Database connection failed."
@@ -290,29 +2406,25 @@ def create_activity(activity_name, activity_date, start_time, end_time, capacity
         start_time_str = start_time.strftime("%H:%M:%S")  # Oracle TIMESTAMP format
         end_time_str = end_time.strftime("%H:%M:%S")  # Oracle TIMESTAMP format
 
-        # Find the current maximum activityid
-        cursor.execute("SELECT MAX(activityid) FROM Activity")
-        max_activityid = cursor.fetchone()[0] or 0
-
-        # Get the current next value of the activity_seq sequence
-        cursor.execute("SELECT activity_seq.NEXTVAL FROM dual")
-        current_seq_value = cursor.fetchone()[0]
+        # Refuse double bookings for the instructor or the room
+        slot = (None, datetime.combine(activity_date, start_time), datetime.combine(activity_date, end_time), instructor_id, location)
+        if slot[2] <= slot[1]:
+            return "End time must be after the start time."
+        conflicts = validate_schedule_in_db(connection, cursor, [slot])
+        if conflicts:
+            connection.rollback()
+            return f"Schedule conflict: {describe_conflicts(conflicts[0])}"
 
-        # If the sequence is behind, restart it with a value higher than max_activityid
-        if current_seq_value <= max_activityid:
-            new_value = max_activityid + 1
-            cursor.execute(f"ALTER SEQUENCE activity_seq RESTART START WITH {new_value}")
-            connection.commit()
-            cursor.execute("SELECT activity_seq.NEXTVAL FROM dual")
-            current_seq_value = cursor.fetchone()[0]
+        # Take the next activityid from the shared allocator
+        activity_id = get_id_allocator().next_id(connection, "activity_seq")
 
-        # Insert the new activity into the Activity table using the adjusted sequence
+        # Insert the new activity into the Activity table
         cursor.execute("""
             INSERT INTO Activity (activityid, activityname, activity_date, start_time, end_time, capacity, location, price)
             VALUES (:activity_id, :activity_name, TO_DATE(:activity_date, 'DD-MON-YY'), TO_TIMESTAMP(:start_time, 'HH24:MI:SS'),
                     TO_TIMESTAMP(:end_time, 'HH24:MI:SS'), :capacity, :location, :price)
         """, {
-            'activity_id': current_seq_value,
+            'activity_id': activity_id,
             'activity_name': activity_name,
             'activity_date': activity_date_str,
             'start_time': start_time_str,
@@ -322,11 +2434,14 @@ def create_activity(activity_name, activity_date, start_time, end_time, capacity
             'price': price
         })
         cursor.execute("INSERT INTO InstructorActivity (activityid, instructorid) VALUES (:activity_id, :instructor_id)", {
-            'activity_id': current_seq_value,
+            'activity_id': activity_id,
             'instructor_id': instructor_id
         })
+        cursor.execute("INSERT INTO ActivitySignupCount (activityid, taken) VALUES (:activity_id, 0)", {'activity_id': activity_id})
 
         connection.commit()
+        get_schedule_cache().record(activity_id, *slot[1:])
+        invalidate_activity_caches()
         return f"Activity '{activity_name}' created successfully!"
 
     except Exception as e:
@@ -336,8 +2451,97 @@ def create_activity(activity_name, activity_date, start_time, end_time, capacity
         cursor.close()
         connection.close()
 
+SERIES_MAX_OCCURRENCES = 500  # Most sessions one "create series" submission may generate
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Dates from start_date to end_date (inclusive) falling on `weekdays` (0 = Monday), minus `skip_dates`
+def series_dates(start_date, end_date, weekdays, skip_dates=()):
+    skip = set(skip_dates)
+    days = (start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1))
+    return [day for day in days if day.weekday() in weekdays and day not in skip]
+
+# Create a weekly series of activities in one transaction: every occurrence is generated up front,
+# checked for clashes in one pass, and inserted with array-bound executemany() calls.
+# Clashing dates are skipped and rows the database rejects are reported without stopping the batch.
+# Returns (message, results) where results has one {'Date', 'Activity ID', 'Result'} entry per date.
+@instrumented("create_activity_series")
+def create_activity_series(activity_name, start_date, end_date, weekdays, start_time, end_time, capacity, location,
+                           price, instructor_id, skip_dates=()):
+    location = normalize_location(location)  # Same value for the conflict check and the inserts
+    if end_time <= start_time:
+        return "End time must be after the start time.", []
+    dates = series_dates(start_date, end_date, weekdays, skip_dates)
+    if not dates:
+        return "The recurrence rule does not produce any dates.", []
+    if len(dates) > SERIES_MAX_OCCURRENCES:
+        return f"The series has {len(dates)} sessions; at most {SERIES_MAX_OCCURRENCES} can be created at once.", []
+
+    connection = get_db_connection()
+    if not connection:
+        return "Database connection failed.", []
+
+    cursor = connection.cursor()
+    results = {}  # date -> (activity_id, result)
+    created = []
+
+    try:
+        slots = [(None, datetime.combine(day, start_time), datetime.combine(day, end_time), instructor_id, location) for day in dates]
+        conflicts = validate_schedule_in_db(connection, cursor, slots)
+        for position, found in conflicts.items():
+            results[dates[position]] = (None, f"Schedule conflict: {describe_conflicts(found)}")
+        pending = [day for position, day in enumerate(dates) if position not in conflicts]
+
+        if pending:
+            activity_ids = get_id_allocator().next_ids(connection, "activity_seq", len(pending))
+            start_time_str = start_time.strftime("%H:%M:%S")
+            end_time_str = end_time.strftime("%H:%M:%S")
+            rows = [
+                (activity_id, activity_name, day.strftime("%d-%b-%y"), start_time_str, end_time_str, capacity, location, price)
+                for activity_id, day in zip(activity_ids, pending)
+            ]
+            # batcherrors keeps going past bad rows and reports them afterwards
+            cursor.executemany("""
+                INSERT INTO Activity (activityid, activityname, activity_date, start_time, end_time, capacity, location, price)
+                VALUES (:1, :2, TO_DATE(:3, 'DD-MON-YY'), TO_TIMESTAMP(:4, 'HH24:MI:SS'), TO_TIMESTAMP(:5, 'HH24:MI:SS'), :6, :7, :8)
+            """, rows, batcherrors=True)
+            failed = {error.offset: error.message for error in cursor.getbatcherrors()}
+            for offset, message in failed.items():
+                results[pending[offset]] = (None, message)
+            created = [(activity_id, day) for offset, (activity_id, day) in enumerate(zip(activity_ids, pending)) if offset not in failed]
+
+            # The child rows go in all-or-nothing: an activity without its instructor must not be committed
+            if created:
+                cursor.executemany("INSERT INTO InstructorActivity (activityid, instructorid) VALUES (:1, :2)",
+                                   [(activity_id, instructor_id) for activity_id, _ in created])
+                cursor.executemany("INSERT INTO ActivitySignupCount (activityid, taken) VALUES (:1, 0)",
+                                   [(activity_id,) for activity_id, _ in created])
+
+        connection.commit()
+
+    except Exception as e:
+        connection.rollback()
+        return f"Failed to create the series: {e}", []
+
+    finally:
+        cursor.close()
+        connection.close()
+
+    schedule = get_schedule_cache()
+    for activity_id, day in created:
+        results[day] = (activity_id, "Created.")
+        schedule.record(activity_id, datetime.combine(day, start_time), datetime.combine(day, end_time), instructor_id, location)
+    if created:
+        invalidate_activity_caches()
+
+    return (
+        f"Created {len(created)} of {len(dates)} sessions of '{activity_name}'.",
+        [{'Date': day, 'Activity ID': activity_id, 'Result': result} for day, (activity_id, result) in sorted(results.items())],
+    )
+
 # Function to update an existing activity
+@instrumented("update_activity")
 def update_activity(activity_id, activity_name, activity_date, start_time, end_time, capacity, location, price, instructor_id):
+    location = normalize_location(location)  # Same value for the conflict check and the update
     connection = get_db_connection()
     if not connection:
         return "Database connection failed."
@@ -349,6 +2553,14 @@ def update_activity(activity_id, activity_name, activity_date, start_time, end_t
         start_time_str = start_time.strftime("%H:%M:%S")
         end_time_str = end_time.strftime("%H:%M:%S")
 
+        slot = (activity_id, datetime.combine(activity_date, start_time), datetime.combine(activity_date, end_time), instructor_id, location)
+        if slot[2] <= slot[1]:
+            return "End time must be after the start time."
+        conflicts = validate_schedule_in_db(connection, cursor, [slot])
+        if conflicts:
+            connection.rollback()
+            return f"Schedule conflict: {describe_conflicts(conflicts[0])}"
+
         # Correct the SQL query
         cursor.execute("""
             UPDATE Activity
@@ -377,6 +2589,8 @@ def update_activity(activity_id, activity_name, activity_date, start_time, end_t
         })
 
         connection.commit()
+        get_schedule_cache().record(*slot)
+        invalidate_activity_caches()
         return f"Activity '{activity_name}' updated successfully!"
 
     except Exception as e:
@@ -386,8 +2600,14 @@ def update_activity(activity_id, activity_name, activity_date, start_time, end_t
         cursor.close()
         connection.close()
 
-# Function to check for dependencies before attempting to delete an activity
-def has_child_records(activity_id):
+# Function to check for dependencies before attempting to delete an activity.
+# Pass the caller's cursor to run the check inside its transaction instead of on a new connection.
+@instrumented("has_child_records")
+def has_child_records(activity_id, cursor=None):
+    if cursor is not None:
+        cursor.execute("SELECT COUNT(*) FROM SignUp WHERE activityid = :activity_id AND ROWNUM = 1", {'activity_id': activity_id})
+        return cursor.fetchone()[0] > 0
+
     connection = get_db_connection()
     if not connection:
         return True  # Treat as having child records if connection fails
@@ -395,9 +2615,7 @@ def has_child_records(activity_id):
     cursor = connection.cursor()
     try:
         # Check for any related records in "SIGNUP" table
-        cursor.execute("SELECT COUNT(*) FROM SignUp WHERE activityid = :activity_id", {'activity_id': activity_id})
-        count = cursor.fetchone()[0]
-        return count > 0  # Return True if there are child records
+        return has_child_records(activity_id, cursor)  # Return True if there are child records
     except Exception as e:
         # Log the error or handle it accordingly
         print(f"Error checking for child records: {e}")
@@ -407,10 +2625,8 @@ def has_child_records(activity_id):
         connection.close()
 
 # Function to delete an activity
+@instrumented("delete_activity")
 def delete_activity(activity_id):
-    if has_child_records(activity_id):
-        return "Cannot delete this activity because it has associated records."
-
     connection = get_db_connection()
     if not connection:
         return "Database connection failed."
@@ -418,8 +2634,14 @@ def delete_activity(activity_id):
     cursor = connection.cursor()
 
     try:
+        if has_child_records(activity_id, cursor):
+            return "Cannot delete this activity because it has associated records."
+
+        cursor.execute("DELETE FROM ActivitySignupCount WHERE activityid = :activity_id", {'activity_id': activity_id})
         cursor.execute("DELETE FROM Activity WHERE activityid = :activity_id", {'activity_id': activity_id})
         connection.commit()
+        get_schedule_cache().record(activity_id)
+        invalidate_activity_caches()
         return "Activity deleted successfully!"
     except Exception as e:
         return f"Failed to delete activity: {e}"
@@ -427,27 +2649,116 @@ def delete_activity(activity_id):
         cursor.close()
         connection.close()
 
-# Function to fetch all activities for editing or deletion
-def fetch_all_activities():
+PURGE_BATCH_SIZE = 500  # Activities deleted or archived per statement (and per commit)
+
+# Statements run per batch; :ids is bound as a SYS.ODCINUMBERLIST of activity IDs
+ARCHIVE_STATEMENTS = [
+    "INSERT INTO ActivityArchive SELECT a.*, SYSDATE FROM Activity a WHERE a.activityid IN (SELECT column_value FROM TABLE(:ids))",
+    "INSERT INTO InstructorActivityArchive SELECT ia.*, SYSDATE FROM InstructorActivity ia WHERE ia.activityid IN (SELECT column_value FROM TABLE(:ids))",
+    "INSERT INTO SignUpArchive SELECT s.*, SYSDATE FROM SignUp s WHERE s.activityid IN (SELECT column_value FROM TABLE(:ids))",
+    "DELETE FROM SignUp WHERE activityid IN (SELECT column_value FROM TABLE(:ids))",
+]
+DELETE_STATEMENTS = [
+    "DELETE FROM ActivitySignupCount WHERE activityid IN (SELECT column_value FROM TABLE(:ids))",
+    "DELETE FROM InstructorActivity WHERE activityid IN (SELECT column_value FROM TABLE(:ids))",
+    "DELETE FROM Activity WHERE activityid IN (SELECT column_value FROM TABLE(:ids))",
+]
+
+# Bulk clean-up of activities picked by ID and/or scheduled before `older_than`.
+# One set-based query splits them into deletable (no sign-ups) and archivable (has sign-ups);
+# archivable ones are copied with their sign-ups into the *Archive tables before removal.
+# Returns {'deleted': n, 'archived': n, 'errors': [...]}.
+@instrumented("purge_activities")
+def purge_activities(activity_ids=None, older_than=None):
+    summary = {'deleted': 0, 'archived': 0, 'errors': []}
+    if not activity_ids and older_than is None:
+        return summary
+
     connection = get_db_connection()
     if not connection:
-        return None
+        summary['errors'].append("Database connection failed.")
+        return summary
 
+    id_list_type = connection.gettype("SYS.ODCINUMBERLIST")
     cursor = connection.cursor()
 
     try:
-        cursor.execute("SELECT activityid, activityname FROM Activity ORDER BY activityname")
-        activities = cursor.fetchall()
-        return activities
+        conditions = []
+        params = {}
+        if activity_ids:
+            conditions.append("a.activityid IN (SELECT column_value FROM TABLE(:ids))")
+            params['ids'] = id_list_type.newobject(list(activity_ids))
+        if older_than is not None:
+            conditions.append("a.activity_date < :cutoff")
+            params['cutoff'] = older_than
+        cursor.execute(f"""
+            SELECT a.activityid,
+                   CASE WHEN EXISTS (SELECT 1 FROM SignUp s WHERE s.activityid = a.activityid) THEN 1 ELSE 0 END
+            FROM Activity a
+            WHERE {" OR ".join(conditions)}
+        """, params)
+        classified = cursor.fetchall()
+        deletable = [activity_id for activity_id, has_signups in classified if not has_signups]
+        archivable = [activity_id for activity_id, has_signups in classified if has_signups]
+
+        for ids, statements, counter in ((archivable, ARCHIVE_STATEMENTS + DELETE_STATEMENTS, 'archived'),
+                                         (deletable, DELETE_STATEMENTS, 'deleted')):
+            for start in range(0, len(ids), PURGE_BATCH_SIZE):
+                batch = ids[start:start + PURGE_BATCH_SIZE]
+                try:
+                    id_list = id_list_type.newobject(batch)
+                    for statement in statements:
+                        cursor.execute(statement, ids=id_list)
+                    connection.commit()
+                    summary[counter] += len(batch)
+                except Exception as e:
+                    connection.rollback()
+                    summary['errors'].append(f"Batch starting at activity {batch[0]}: {e}")
 
     except Exception as e:
-        st.error("Failed to fetch activities.")
-        return None
+        summary['errors'].append(f"Failed to clean up activities: {e}")
 
     finally:
         cursor.close()
         connection.close()
 
+    if summary['deleted'] or summary['archived']:
+        get_schedule_cache().invalidate()
+        invalidate_activity_caches()
+    return summary
+
+# Function to fetch all activities for editing or deletion
+def fetch_all_activities():
+    return get_reference_data().get()["activities"] or None
+
+# Run an ad-hoc query function on a worker thread while this script run keeps polling.
+# The polling gives Streamlit a point to stop the run when the admin clicks Cancel;
+# the Cancel callback then interrupts the statement itself through cancel_custom_query().
+def run_cancellable(status, describe, fn):
+    outcome = {}
+
+    def work():
+        try:
+            outcome["result"] = fn()
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=work, name="custom-query", daemon=True)
+    add_script_run_ctx(worker)
+    started = time.perf_counter()
+    worker.start()
+    while worker.is_alive():
+        worker.join(0.25)
+        status.text(describe(time.perf_counter() - started))
+    status.empty()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+def request_query_cancel(cancel_key):
+    if cancel_custom_query(cancel_key):
+        st.session_state["custom_query_cancelled"] = True
+
 # Streamlit Admin Menu for Managing Activities
 def manage_activities():
     st.subheader("Admin: Manage Activities")
@@ -455,7 +2766,9 @@ def manage_activities():
     # Tabs for creating, editing, or deleting activities
     tabs = st.tabs(["Create Activity", "Edit Activity", "Delete Activity"])
 
-    instructors = fetch_instructors()
+    # One reference-data read serves all three tabs (Streamlit renders every tab on each rerun)
+    reference = get_reference_data().get()
+    instructors = reference["instructors"]
     instructor_map = {f"{name} (ID: {id})": id for id, name in instructors} if instructors else {}
 
     # Tab 1: Create Activity
@@ -467,22 +2780,53 @@ def manage_activities():
         start_time = st.time_input("Start Time", key="create_start_time")
         end_time = st.time_input("End Time", key="create_end_time")
         capacity = st.number_input("Capacity", min_value=1, key="create_capacity")  # Add capacity field
-        location = st.text_input("Location", key="create_location")
+        location = normalize_location(st.text_input("Location", key="create_location"))
         price = st.number_input("Price", min_value=0.0, format="%.2f", key="create_price")
         instructor_choice = st.selectbox("Instructor", list(instructor_map.keys()), key="create_instructor")
+        repeat = st.checkbox("Repeat weekly", key="create_repeat")
+
+        if repeat:
+            series_cols = st.columns(3)
+            weekdays = series_cols[0].multiselect("On", WEEKDAYS, default=[WEEKDAYS[activity_date.weekday()]], key="create_weekdays")
+            series_end = series_cols[1].date_input("Until", activity_date + timedelta(weeks=12), min_value=activity_date, key="create_series_end")
+            skip_text = series_cols[2].text_input("Skip dates (YYYY-MM-DD, comma-separated)", key="create_skip_dates")
+            try:
+                skip_dates = [date.fromisoformat(part.strip()) for part in skip_text.split(",") if part.strip()]
+            except ValueError:
+                skip_dates = None
+                st.warning("Skip dates must be written like 2025-12-25.")
+            weekday_numbers = [WEEKDAYS.index(day) for day in weekdays]
+            dates = series_dates(activity_date, series_end, weekday_numbers, skip_dates or ())
+            if instructor_choice and dates and end_time > start_time:
+                clashes = find_schedule_conflicts([
+                    (None, datetime.combine(day, start_time), datetime.combine(day, end_time), instructor_map[instructor_choice], location)
+                    for day in dates
+                ])
+                st.caption(f"{len(dates)} sessions" + (f"; {len(clashes)} clash with existing bookings and will be skipped." if clashes else "."))
+        elif instructor_choice:
+            warning = schedule_conflict_warning(None, activity_date, start_time, end_time, instructor_map[instructor_choice], location)
+            if warning:
+                st.warning(warning)
 
         if st.button("Create Activity", key="create_activity_button"):
-            if activity_name and location and price >= 0:
+            if activity_name and location and price >= 0 and (not repeat or (weekdays and skip_dates is not None)):
                 instructor_id = instructor_map[instructor_choice]  # Extract instructor_id
-                result = create_activity(activity_name, activity_date, start_time, end_time, capacity, location, price, instructor_id)
-                st.success(result)
+                if repeat:
+                    message, results = create_activity_series(activity_name, activity_date, series_end, weekday_numbers, start_time,
+                                                              end_time, capacity, location, price, instructor_id, skip_dates)
+                    st.success(message)
+                    if results:
+                        st.dataframe(pd.DataFrame(results).astype({'Activity ID': 'Int64'}), hide_index=True)
+                else:
+                    result = create_activity(activity_name, activity_date, start_time, end_time, capacity, location, price, instructor_id)
+                    st.success(result)
             else:
                 st.warning("Please fill in all the fields correctly.")
 
     # Tab 2: Edit Activity
     with tabs[1]:
         st.subheader("Edit an Existing Activity")
-        activities = fetch_all_activities()
+        activities = reference["activities"]
         if activities:
             activity_map = {f"{name} (ID: {id})": id for id, name in activities}
             activity_choice = st.selectbox("Select an Activity to Edit", list(activity_map.keys()), key="edit_activity_choice")
@@ -494,9 +2838,13 @@ def manage_activities():
             start_time = st.time_input("Start Time", key="edit_start_time")
             end_time = st.time_input("End Time", key="edit_end_time")
             capacity = st.number_input("Capacity", min_value=1, key="edit_capacity")
-            location = st.text_input("Location", key="edit_location")
+            location = normalize_location(st.text_input("Location", key="edit_location"))
             price = st.number_input("Price", min_value=0.0, format="%.2f", key="edit_price")
             instructor_choice = st.selectbox("Instructor", list(instructor_map.keys()), key="edit_instructor")
+            if instructor_choice:
+                warning = schedule_conflict_warning(activity_id, activity_date, start_time, end_time, instructor_map[instructor_choice], location)
+                if warning:
+                    st.warning(warning)
 
             if st.button("Update Activity", key="update_activity_button"):
                 if activity_name and location and price >= 0:
@@ -511,26 +2859,50 @@ def manage_activities():
     # Tab 3: Delete Activity
     with tabs[2]:
         st.subheader("Delete an Activity")
-        activities = fetch_all_activities()
+        activities = reference["activities"]
         if activities:
             activity_map = {f"{name} (ID: {id})": id for id, name in activities}
             activity_choice = st.selectbox("Select an Activity to Delete", list(activity_map.keys()), key="delete_activity_choice")
             activity_id = activity_map[activity_choice]
 
             if st.button("Delete Activity", key="delete_activity_button"):
-                if not has_child_records(activity_id):
-                    result = delete_activity(activity_id)
+                result = delete_activity(activity_id)
+                if result == "Activity deleted successfully!":
                     st.success(result)
                 else:
-                    st.warning("Cannot delete this activity because it has associated records.")
+                    st.warning(result)
+
+            st.subheader("Bulk Clean-up")
+            st.write("Activities without sign-ups are deleted; activities with sign-ups are moved to the archive tables.")
+            selected = st.multiselect("Activities", list(activity_map.keys()), key="purge_activity_choice")
+            months = st.number_input("Also include activities older than (months, 0 = none)", min_value=0, value=0, key="purge_months")
+            if st.button("Delete / Archive", key="purge_activities_button"):
+                older_than = date.today() - timedelta(days=30 * months) if months else None
+                summary = purge_activities([activity_map[choice] for choice in selected], older_than)
+                st.success(f"{summary['deleted']} activities deleted, {summary['archived']} archived.")
+                for error in summary['errors']:
+                    st.error(error)
         else:
             st.warning("No activities found.")
 
 # Streamlit App Layout
 def main():
-    st.image("https://images.unsplash.com/photo-1588286840104-8957b019727f?q=80&w=2940&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D", use_column_width=True)
+    st.image(get_banner(), width="stretch")
     st.title("Activity Sign-up System")
 
+    healthy, health_message = get_database_health().status()
+    if healthy:
+        st.sidebar.caption(health_message)
+    else:
+        st.error(health_message)
+
+    schema_error = get_required_schema().ensure()
+    if schema_error:
+        st.error(schema_error)
+    else:
+        get_seat_count_reconciler()  # Starts the background recount once the startup backfill is done
+    get_id_allocator()  # Reconciles the ID sequences before any write needs them
+
     st.sidebar.title("Navigation")
     section = st.sidebar.radio("Main Menu", ["Member", "Admin"])
 
@@ -556,79 +2928,320 @@ def main():
             st.subheader("Activity Sign-up")
             member_name = st.text_input("Enter your Name")
             email = st.text_input("Enter your Email")
-            activity_id = st.text_input("Enter Activity ID")
+
+            basket = st.session_state.setdefault("signup_basket", {})
+            if basket:
+                st.write("**Your basket:**")
+                st.dataframe(pd.DataFrame(list(basket.items()), columns=['Activity ID', 'Activity Name']), hide_index=True)
+                if st.button("Clear basket"):
+                    basket.clear()
+                    st.rerun()
+            else:
+                st.info("Pick activities on the Browse Activities page to fill your basket, or enter IDs below.")
+
+            extra_ids = st.text_input("Additional Activity IDs (comma-separated)")
             if st.button("Sign Up"):
-                if member_name and email and activity_id:
-                    result = signup_for_activity(member_name, email, activity_id)
-                    st.success(result)
+                activity_ids = list(basket) + [id for id in extra_ids.split(",") if id.strip()]
+                if member_name and email and activity_ids:
+                    message, results = signup_for_activities(member_name, email, activity_ids)
+                    st.success(message)
+                    if results:
+                        st.dataframe(pd.DataFrame(results).astype({'Activity ID': str}), hide_index=True)
+                    for result in results:
+                        if result['Result'] == "Signed up.":
+                            basket.pop(result['Activity ID'], None)
                 else:
                     st.warning("Please fill all fields!")
 
         elif member_menu == "Browse Activities":
             st.subheader("Browse Activities")
-            activities_df = browse_activities()
+
+            instructors = fetch_instructors()
+            instructor_map = {"Any instructor": None}
+            instructor_map.update({name: id for id, name in instructors})
+
+            filter_cols = st.columns(4)
+            date_range = filter_cols[0].date_input(
+                "Dates", (date.today(), date.today() + timedelta(days=BROWSE_DEFAULT_WINDOW_DAYS)), key="browse_dates"
+            )
+            location = filter_cols[1].text_input("Location", key="browse_location").strip()
+            instructor_id = instructor_map[filter_cols[2].selectbox("Instructor", list(instructor_map.keys()), key="browse_instructor")]
+            max_price = filter_cols[3].number_input("Max Price", min_value=0.0, value=None, format="%.2f", key="browse_max_price")
+
+            start_date = date_range[0] if date_range else None
+            end_date = date_range[1] if len(date_range) > 1 else None
+            filters = (start_date, end_date, location, instructor_id, max_price)
+
+            # Keyset cursors of the pages already visited; reset whenever the filters change
+            if st.session_state.get("browse_filters") != filters:
+                st.session_state["browse_filters"] = filters
+                st.session_state["browse_cursors"] = [None]
+            cursors = st.session_state["browse_cursors"]
+
+            activities_df, next_cursor = browse_activities(*filters, after=cursors[-1])
             if activities_df is not None:
                 st.write("**Available Activities:**")
-                st.dataframe(activities_df)
+                table = st.dataframe(activities_df, hide_index=True, on_select="rerun", selection_mode="multi-row", key="browse_table")
+
+                basket = st.session_state.setdefault("signup_basket", {})
+                selected = activities_df.iloc[table.selection.rows]
+                if st.button(f"Add {len(selected)} selected to basket", disabled=selected.empty, key="browse_add_to_basket"):
+                    basket.update(zip(selected['Activity ID'].astype(int), selected['Activity Name']))
+                st.caption(f"{len(basket)} activities in your basket. Sign up for them on the Activity Sign-up page.")
+
+                nav_cols = st.columns([1, 1, 6])
+                if nav_cols[0].button("Previous", disabled=len(cursors) == 1, key="browse_previous"):
+                    cursors.pop()
+                    st.rerun()
+                if nav_cols[1].button("Next", disabled=next_cursor is None, key="browse_next"):
+                    cursors.append(next_cursor)
+                    st.rerun()
+                cache_stats = get_browse_cache().stats()
+                nav_cols[2].caption(f"Page {len(cursors)} · activity cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
             else:
                 st.warning("No activities found.")
 
     elif section == "Admin":
         st.sidebar.subheader("Admin Options")
-        admin_menu = st.sidebar.radio("Select Admin Option", ["Generate Reports", "Data", "Manage Activities"])
+        admin_menu = st.sidebar.radio("Select Admin Option", ["Generate Reports", "Analytics", "Data", "Manage Activities", "Import Members", "Performance"])
 
         if admin_menu == "Generate Reports":
             st.subheader("Admin: Generate Signup Report")
+
+            activities = fetch_all_activities() or []
+            activity_map = {"All activities": None}
+            activity_map.update({f"{name} (ID: {id})": id for id, name in activities})
+
+            filter_cols = st.columns(2)
+            date_range = filter_cols[0].date_input("Signup Dates", (), key="report_dates")
+            activity_id = activity_map[filter_cols[1].selectbox("Activity", list(activity_map.keys()), key="report_activity")]
+            start_date = date_range[0] if date_range else None
+            end_date = date_range[1] if len(date_range) > 1 else None
+
             if st.button("Generate Report"):
-                report_data = generate_signup_report()
-                if report_data:
-                    st.write("**Signup Report:**")
-                    for row in report_data:
-                        st.write(f"{row[0]} signed up for {row[1]} on {row[2]}")
-                else:
-                    st.warning("No signup data available.")
+                # Kept in session state so paging through the table doesn't re-run the query
+                st.session_state["signup_report"] = generate_signup_report(start_date, end_date, activity_id)
+
+            report_df, truncated = st.session_state.get("signup_report", (None, False))
+            if report_df is not None:
+                st.write("**Signup Report:**")
+                if truncated:
+                    st.info(f"Showing the most recent {REPORT_MAX_ROWS} signups only. Narrow the filters to see older ones.")
+                page_count = max(1, -(-len(report_df) // REPORT_PAGE_SIZE))
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key="report_page")
+                offset = (page - 1) * REPORT_PAGE_SIZE
+                st.dataframe(report_df.iloc[offset:offset + REPORT_PAGE_SIZE], hide_index=True)
+                st.caption(f"{len(report_df)} signups · page {page} of {page_count}")
+            elif "signup_report" in st.session_state:
+                st.warning("No signup data available.")
+
+        elif admin_menu == "Analytics":
+            st.subheader("Admin: Sign-up Analytics")
+            fill_tab, trend_tab = st.tabs(["Fill Rates", "Sign-up Trend"])
+
+            # Both tabs render on every run, so read both sets of filters first and load the two views together
+            with fill_tab:
+                filter_cols = st.columns(2)
+                group_by = filter_cols[0].selectbox("Group by", list(ANALYTICS_GROUPINGS), key="analytics_group_by")
+                activity_dates = filter_cols[1].date_input("Activity Dates", (), key="analytics_activity_dates")
+                fill_output = st.container()
+
+            with trend_tab:
+                filter_cols = st.columns(3)
+                bucket = filter_cols[0].selectbox("Period", list(ANALYTICS_BUCKETS), index=1, key="analytics_bucket")
+                split_by = filter_cols[1].selectbox("Split by", ["None"] + list(ANALYTICS_SPLITS), key="analytics_split")
+                signup_dates = filter_cols[2].date_input(
+                    "Signup Dates",
+                    (date.today() - timedelta(days=ANALYTICS_TREND_DEFAULT_DAYS), date.today()),
+                    key="analytics_signup_dates",
+                )
+                trend_output = st.container()
+
+            analytics = load_analytics({
+                "fill_rates": (
+                    group_by,
+                    activity_dates[0] if activity_dates else None,
+                    activity_dates[1] if len(activity_dates) > 1 else None,
+                ),
+                "trend": (
+                    bucket,
+                    None if split_by == "None" else split_by,
+                    signup_dates[0] if signup_dates else date.today() - timedelta(days=ANALYTICS_TREND_DEFAULT_DAYS),
+                    signup_dates[1] if len(signup_dates) > 1 else None,
+                ),
+            })
+
+            fill_rates = analytics["fill_rates"]
+            if fill_rates is None:
+                fill_output.info("No activities in this range.")
+            else:
+                fill_output.dataframe(
+                    fill_rates,
+                    hide_index=True,
+                    column_config={"Fill Rate (%)": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.1f%%")},
+                )
+
+            trend = analytics["trend"]
+            if trend is None:
+                trend_output.info("No sign-ups in this range.")
+            else:
+                trend_output.line_chart(trend.drop(columns="Total", errors="ignore"))
+                trend_output.dataframe(trend.rename(index=lambda period: period.strftime("%Y-%m-%d")))
+
+            st.caption(f"Aggregated in the database and cached for {ANALYTICS_CACHE_TTL // 60} minutes per filter combination.")
 
         elif admin_menu == "Data":
             st.subheader("Admin: Run SQL Queries")
 
-            query = st.text_area("Enter your SQL query")
-            if st.button("Execute Query"):
-                if query.strip().lower().startswith("select"):
-                    try:
-                        results = execute_custom_query(query)
-                        if not results.empty:
-                            st.write("**Query Results:**")
-                            st.dataframe(results)
-
-                            csv_data = results.to_csv(index=False).encode('utf-8')
-
-                            with io.BytesIO() as buffer:
-                                with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                                    results.to_excel(writer, index=False)
-                                excel_data = buffer.getvalue()
-
-                            st.download_button(
-                                label="Download as CSV",
-                                data=csv_data,
-                                file_name='query_result.csv',
-                                mime='text/csv'
-                            )
-
-                            st.download_button(
-                                label="Download as Excel",
-                                data=excel_data,
-                                file_name='query_result.xlsx',
-                                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            query = st.text_area("Enter your SQL query").strip().rstrip(";")
+            cancel_key = st.session_state.setdefault("custom_query_session", uuid.uuid4().hex)
+            if st.session_state.pop("custom_query_cancelled", False):
+                st.info("Query cancelled.")
+
+            action_cols = st.columns(3)
+            run_clicked = action_cols[0].button("Execute Query")
+            explain_clicked = action_cols[1].button("Explain Plan")
+            force_refresh = action_cols[2].checkbox("Force refresh", help=f"Ignore results cached in the last {QUERY_CACHE_TTL // 60} minutes")
+            if (run_clicked or explain_clicked) and not query.lower().startswith("select"):
+                st.session_state.pop("custom_query", None)
+                st.error("Only SELECT queries are allowed for safety.")
+            elif explain_clicked:
+                try:
+                    plan, plan_warnings = explain_custom_query(query)
+                except oracledb.DatabaseError as e:
+                    st.error(f"Could not explain the query: {e}")
+                else:
+                    for warning in plan_warnings:
+                        st.warning(warning)
+                    if plan is not None:
+                        if not plan_warnings:
+                            st.success("No full scans of large tables in this plan.")
+                        st.dataframe(plan, hide_index=True)
+            elif run_clicked:
+                st.button("Cancel query", key="cancel_query", on_click=request_query_cancel, args=(cancel_key,))
+                try:
+                    preview = run_cancellable(
+                        st.empty(),
+                        lambda elapsed: f"Running... {elapsed:.0f}s (limit {CUSTOM_QUERY_TIMEOUT}s per call)",
+                        lambda: execute_custom_query(query, cancel_key=cancel_key, refresh=force_refresh),
+                    )
+                except oracledb.DatabaseError as e:
+                    st.session_state.pop("custom_query", None)
+                    st.error(f"An error occurred: {e}")
+                else:
+                    # Remember the query so the export buttons below survive their own rerun
+                    st.session_state["custom_query"] = query
+                    st.session_state["custom_query_preview"] = preview
+
+            if "custom_query" in st.session_state:
+                results, preview_truncated, cached_at = st.session_state["custom_query_preview"]
+                if results is not None and not results.empty:
+                    st.write("**Query Results:**")
+                    if cached_at is not None:
+                        st.caption(f"From cache, fetched at {cached_at:%H:%M:%S}. Tick Force refresh to re-run it.")
+                    st.dataframe(results)
+                    if preview_truncated:
+                        st.caption(f"Showing the first {QUERY_PREVIEW_ROWS} rows. Exports contain up to {CUSTOM_QUERY_MAX_ROWS:,} rows.")
+
+                    # Exports are only generated when asked for, streamed straight from the database
+                    export_cols = st.columns(2)
+                    requested_format = None
+                    if export_cols[0].button("Export as CSV", key="export_csv"):
+                        requested_format = "csv"
+                    if export_cols[1].button("Export as Excel", key="export_xlsx"):
+                        requested_format = "xlsx"
+
+                    if requested_format:
+                        st.button("Cancel export", key="cancel_export", on_click=request_query_cancel, args=(cancel_key,))
+                        exported = {"rows": 0}
+                        try:
+                            export_file, rows_written, truncated = run_cancellable(
+                                st.empty(),
+                                lambda elapsed: f"Exported {exported['rows']:,} rows... {elapsed:.0f}s",
+                                lambda: export_custom_query(
+                                    st.session_state["custom_query"],
+                                    requested_format,
+                                    progress=lambda count: exported.update(rows=count),
+                                    cancel_key=cancel_key,
+                                    refresh=force_refresh,
+                                ),
                             )
+                        except Exception as e:
+                            st.error(f"An error occurred: {e}")
                         else:
-                            st.warning("Query returned no results.")
-                    except Exception as e:
-                        st.error(f"An error occurred: {e}")
+                            if export_file is not None:
+                                st.text(f"Exported {rows_written:,} rows.")
+                                if truncated:
+                                    limit = min(CUSTOM_QUERY_MAX_ROWS, EXCEL_MAX_ROWS) if requested_format == "xlsx" else CUSTOM_QUERY_MAX_ROWS
+                                    st.warning(f"Export stopped at {limit:,} rows. Narrow the query to get the rest.")
+                                file_name, mime = EXPORT_FORMATS[requested_format]
+                                st.download_button(
+                                    label=f"Download {file_name}",
+                                    data=export_reader(export_file),
+                                    file_name=file_name,
+                                    mime=mime,
+                                    on_click="ignore",
+                                )
                 else:
-                    st.error("Only SELECT queries are allowed for safety.")
+                    st.warning("Query returned no results.")
+
+            with st.expander("Maintenance"):
+                if st.button("Reconcile ID sequences", key="reconcile_sequences_button"):
+                    st.info(reconcile_id_sequences())
+                if st.button("Reconcile seat counts", key="reconcile_seats_button"):
+                    st.info(reconcile_seat_counts())
+                if st.button("Create supporting indexes", key="schema_upgrades_button"):
+                    for line in apply_schema_upgrades():
+                        st.write(line)
 
         elif admin_menu == "Manage Activities":
             manage_activities()
 
+        elif admin_menu == "Performance":
+            st.subheader("Admin: Performance")
+            metrics = get_metrics()
+            summary = metrics.summary()
+            if summary.empty:
+                st.info("No data functions have run in this process yet.")
+            else:
+                st.dataframe(summary, hide_index=True)
+            st.caption(f"Percentiles over the last {METRICS_WINDOW} calls per operation. "
+                       f"Statements slower than {SLOW_QUERY_SECONDS}s are logged with their SQL text and bind names.")
+
+            cache_stats = get_browse_cache().stats()
+            st.write(f"**Browse cache:** {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries, "
+                     f"{cache_stats['stale']} last-known-good")
+            member_stats = get_member_cache().stats()
+            st.write(f"**Member lookup cache:** {member_stats['hits']} hits, {member_stats['misses']} misses, {member_stats['entries']} entries")
+            query_stats = get_query_cache().stats()
+            st.write(f"**Query cache:** {query_stats['hits']} hits, {query_stats['misses']} misses, {query_stats['entries']} entries, "
+                     f"{query_stats['bytes'] / 1024 / 1024:.1f} of {QUERY_CACHE_MAX_BYTES // 1024 // 1024} MB")
+            breaker = get_circuit_breaker()
+            st.write(f"**Database circuit breaker:** {breaker.state}, {breaker.failures} consecutive connection failures")
+
+            if st.button("Write Prometheus file", key="write_metrics_button"):
+                metrics.write_prometheus(METRICS_FILE)
+                st.success(f"Metrics written to {os.path.abspath(METRICS_FILE)}")
+            with st.expander("Prometheus text format"):
+                st.code(metrics.prometheus_text(), language="text")
+
+        elif admin_menu == "Import Members":
+            st.subheader("Admin: Bulk Member Import")
+            st.write(f"Upload a CSV or Excel file with the columns: {', '.join(IMPORT_COLUMNS)}.")
+            uploaded_file = st.file_uploader("Member file", type=["csv", "xlsx"])
+            if uploaded_file is not None and st.button("Import Members"):
+                if uploaded_file.name.lower().endswith(".xlsx"):
+                    members_df = pd.read_excel(uploaded_file, dtype=str)
+                else:
+                    members_df = pd.read_csv(uploaded_file, dtype=str)
+
+                with st.spinner(f"Importing {len(members_df)} rows..."):
+                    inserted, failures_df = import_members(members_df)
+                st.success(f"{inserted} members imported.")
+                if not failures_df.empty:
+                    st.warning(f"{len(failures_df)} rows were not imported:")
+                    st.dataframe(failures_df, hide_index=True)
+
 if __name__ == "__main__":
     main()
+    get_metrics().record("script_rerun", defaultdict(float, total=time.perf_counter() - SCRIPT_STARTED))